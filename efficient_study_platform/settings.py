@@ -95,6 +95,12 @@ DATABASES = {
         'PASSWORD': env('MYSQL_PASSWORD'),
         'HOST': env('DATABASE_HOST'),
         'PORT': env('DATABASE_PORT'),
+        # under daphne, the sync code of every HTTP request runs in a new thread, so a persistent connection
+        # is never reused by another request (it stays open until its thread is collected)
+        # CONN_MAX_AGE > 0 only lets the chat consumers reuse a connection between their database_sync_to_async calls
+        # (benchmark_database_connections), real pooling needs an external pooler (e.g. ProxySQL) in front of MySQL
+        'CONN_MAX_AGE': env.int('DATABASE_CONN_MAX_AGE', default=0),
+        'CONN_HEALTH_CHECKS': env.bool('DATABASE_CONN_HEALTH_CHECKS', default=True),
     }
 }
 
@@ -102,9 +108,34 @@ CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.redis.RedisCache",
         "LOCATION": env('REDIS_CACHE_LOCATION'),
+    },
+    # separate cache for the sessions, so they can be moved to another redis database/server
+    # for tests the backend can be replaced with django.core.cache.backends.locmem.LocMemCache
+    "sessions": {
+        "BACKEND": env('SESSIONS_CACHE_BACKEND', default="django.core.cache.backends.redis.RedisCache"),
+        "LOCATION": env('REDIS_SESSIONS_LOCATION', default=env('REDIS_CACHE_LOCATION')),
     }
 }
 
+# the sessions are stored in redis, so the requests don't query the database for the session
+# the sessions stored in the database before can be copied with: python manage.py copy_sessions_to_cache
+# (set SESSION_ENGINE=django.contrib.sessions.backends.cached_db to keep reading the database sessions during the migration)
+SESSION_ENGINE = env('SESSION_ENGINE',
+                     default='django.contrib.sessions.backends.cache')
+SESSION_CACHE_ALIAS = "sessions"
+
+# a study session without connected participants expires after this number of seconds
+STUDY_SESSION_IDLE_TIMEOUT = env.int('STUDY_SESSION_IDLE_TIMEOUT', default=3600)
+
+# the study session messages are saved in batches of this size or after this number of seconds from the first unsaved message
+STUDY_SESSION_MESSAGES_BATCH_SIZE = env.int(
+    'STUDY_SESSION_MESSAGES_BATCH_SIZE', default=50)
+STUDY_SESSION_MESSAGES_FLUSH_INTERVAL = env.float(
+    'STUDY_SESSION_MESSAGES_FLUSH_INTERVAL', default=0.5)
+# a batch which failed to be saved is retried with exponential backoff, at most this number of times
+STUDY_SESSION_MESSAGES_MAX_FLUSH_ATTEMPTS = env.int(
+    'STUDY_SESSION_MESSAGES_MAX_FLUSH_ATTEMPTS', default=5)
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
@@ -160,7 +191,13 @@ STATIC_ROOT = env('STATIC_ROOT_PATH')
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
-EMAIL_BACKEND = "anymail.backends.mailjet.EmailBackend"
+# the console or file backends can be used locally and for testing:
+# EMAIL_BACKEND=django.core.mail.backends.console.EmailBackend
+# EMAIL_BACKEND=django.core.mail.backends.filebased.EmailBackend (with EMAIL_FILE_PATH)
+EMAIL_BACKEND = env('EMAIL_BACKEND',
+                    default="anymail.backends.mailjet.EmailBackend")
+
+EMAIL_FILE_PATH = env('EMAIL_FILE_PATH', default=str(BASE_DIR / 'sent_emails'))
 
 ANYMAIL = {
     "MAILJET_API_KEY": env('MAILJET_API_KEY'),
@@ -169,6 +206,23 @@ ANYMAIL = {
 
 DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL')
 
+# token buckets limiting the verification code requests for every IP address and every email:
+# bursts of VERIFICATION_CODE_RATE_LIMIT_CAPACITY requests, then one request every VERIFICATION_CODE_RATE_LIMIT_INTERVAL seconds
+VERIFICATION_CODE_RATE_LIMIT_CAPACITY = env.int(
+    'VERIFICATION_CODE_RATE_LIMIT_CAPACITY', default=3)
+VERIFICATION_CODE_RATE_LIMIT_INTERVAL = env.float(
+    'VERIFICATION_CODE_RATE_LIMIT_INTERVAL', default=60)
+
+# the emails are sent in background from an outbox (send_queued_emails management command)
+# a failed email is retried after EMAIL_QUEUE_RETRY_DELAY seconds, the delay doubling after every attempt
+EMAIL_QUEUE_BATCH_SIZE = env.int('EMAIL_QUEUE_BATCH_SIZE', default=50)
+EMAIL_QUEUE_MAX_ATTEMPTS = env.int('EMAIL_QUEUE_MAX_ATTEMPTS', default=5)
+EMAIL_QUEUE_RETRY_DELAY = env.float('EMAIL_QUEUE_RETRY_DELAY', default=10)
+
+# the search results are paginated (20 hits per page), the pages after SEARCH_MAX_PAGE are not served
+# (on MySQL the full-text ranking of a page sorts all the hits before it)
+SEARCH_MAX_PAGE = env.int('SEARCH_MAX_PAGE', default=25)
+
 # cloud storage for media uploaded by the users (profile images)
 CLOUDINARY_STORAGE = {
     'CLOUD_NAME': env('CLOUD_NAME'),
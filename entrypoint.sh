@@ -8,5 +8,16 @@ fi
 python manage.py migrate
 python manage.py collectstatic --noinput
 
+# Send in background the emails queued by the website (verification codes)
+# (the worker is restarted if it stops)
+while true; do
+    python manage.py send_queued_emails
+    echo "The emails worker stopped (exit code $?), restarting it in 5 seconds"
+    sleep 5
+done &
+
+# Bounded number of threads of the default executor used by daphne for the synchronous code
+export ASGI_THREADS=${ASGI_THREADS:-8}
+
 # Run Daphne for Django Channels
 daphne -b 0.0.0.0 -p 8000 efficient_study_platform.asgi:application
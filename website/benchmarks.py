@@ -0,0 +1,13 @@
+class QueriesCounter:
+    """
+    database execute wrapper that counts the executed queries (just the ones that use the given table, if there is one)
+    """
+
+    def __init__(self, table: str = None):
+        self.table = table
+        self.queries_number = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.table is None or self.table in sql:
+            self.queries_number += 1
+        return execute(sql, params, many, context)
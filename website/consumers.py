@@ -1,61 +1,206 @@
 import json
+import asyncio
+import atexit
+import logging
 
 from asgiref.sync import async_to_sync
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from .models import StudySessionMessage
-from asgiref.sync import sync_to_async
-from .utils import remove_user_from_study_session, study_session_empty, remove_study_session
+from .utils import atouch_study_session, apush_study_session_message, ajoined_in_study_session
+from django.conf import settings
+from redis.exceptions import RedisError
 from django.utils import timezone
 from datetime import datetime as datetimeClass
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+
+class StudySessionMessageBuffer:
+    """
+    class responsible with the write-behind persistence of the study session messages
+    the messages are saved with a single query (bulk_create) when the buffer has max_size messages
+    or after flush_interval seconds from the first unsaved message
+    the messages which failed to be saved are put back in the buffer and saved again after a delay doubled after every
+    failure, they are dropped after max_flush_attempts consecutive failures
+    """
+
+    def __init__(self, max_size: int, flush_interval: float, max_flush_attempts: int):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.max_flush_attempts = max_flush_attempts
+        self.messages = []
+        self.flush_timer = None
+        self.failed_flushes_number = 0
+        # references to the running flushes (the event loop keeps only weak references to the tasks)
+        self.flush_tasks = set()
+
+        # last resort for the messages left in the buffer when the process exits without stopping the consumers
+        atexit.register(self.flush_sync)
+
+    def add(self, message: StudySessionMessage):
+        self.messages.append(message)
+
+        # after a failure, the messages are saved just when the retry delay passes
+        if len(self.messages) >= self.max_size and not self.failed_flushes_number:
+            self.start_flush()
+        elif self.flush_timer is None:
+            self.flush_timer = asyncio.get_running_loop().call_later(
+                self.flush_interval, self.start_flush)
+
+    def start_flush(self):
+        flush_task = asyncio.get_running_loop().create_task(self.flush())
+        self.flush_tasks.add(flush_task)
+        flush_task.add_done_callback(self.flush_tasks.discard)
+
+    def take_messages(self) -> list:
+        if self.flush_timer is not None:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+
+        messages, self.messages = self.messages, []
+        return messages
+
+    async def flush(self):
+        messages = self.take_messages()
+        if not messages:
+            return
+
+        try:
+            await database_sync_to_async(StudySessionMessage.objects.bulk_create)(messages)
+        except Exception:
+            self.failed_flushes_number += 1
+
+            if self.failed_flushes_number >= self.max_flush_attempts:
+                logger.exception("Dropped %d study session messages after %d failed saves",
+                                 len(messages), self.failed_flushes_number)
+                self.failed_flushes_number = 0
+                return
+
+            logger.warning("Failed to save %d study session messages (attempt %d)",
+                           len(messages), self.failed_flushes_number, exc_info=True)
+
+            # the messages are saved again before the newer ones (bulk_create saved none of them, it is atomic)
+            self.messages[:0] = messages
+            if self.flush_timer is not None:
+                self.flush_timer.cancel()
+            self.flush_timer = asyncio.get_running_loop().call_later(
+                self.flush_interval * 2 ** self.failed_flushes_number, self.start_flush)
+            return
+
+        self.failed_flushes_number = 0
+
+    def flush_sync(self):
+        messages = self.take_messages()
+        if messages:
+            StudySessionMessage.objects.bulk_create(messages)
+
+
+message_buffer = StudySessionMessageBuffer(
+    settings.STUDY_SESSION_MESSAGES_BATCH_SIZE, settings.STUDY_SESSION_MESSAGES_FLUSH_INTERVAL,
+    settings.STUDY_SESSION_MESSAGES_MAX_FLUSH_ATTEMPTS)
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # when daphne shuts down, it cancels the running consumers (disconnect isn't called) and waits for them,
+            # so the buffered messages are saved here, while the event loop is still running
+            await message_buffer.flush()
+
     async def connect(self):
-        self.tzname = self.scope['session'].get('django_timezone')
+        self.tzname = self.scope['session'].get('django_timezone') or 'UTC'
+        # the timezone is resolved once per connection, the messages are converted to it without activating it
+        self.tzinfo = ZoneInfo(self.tzname)
         self.user = self.scope["user"]
         self.session_code = self.scope["url_route"]["kwargs"]["session_code"]
         self.session_group_name = f"study_session_{self.session_code}"
 
+        # just the participants of the study session can chat in it (and keep it alive with heartbeats)
+        if not self.user.is_authenticated or not await ajoined_in_study_session(self.user.username, self.session_code):
+            await self.close()
+            return
+
         await self.channel_layer.group_add(self.session_group_name, self.channel_name)
 
         await self.accept()
 
+        self.heartbeat_task = asyncio.create_task(self.send_heartbeats())
+
     async def disconnect(self, close_code):
+        # the connection was rejected (the user isn't a participant of the study session)
+        if not hasattr(self, 'heartbeat_task'):
+            return
+
+        self.heartbeat_task.cancel()
+
+        await message_buffer.flush()
+
+        # the idle timeout of the study session starts from the moment the user left
+        await atouch_study_session(self.session_code)
+
         await self.channel_layer.group_discard(self.session_group_name, self.channel_name)
 
-    async def save_message(self, message):
-        await database_sync_to_async(StudySessionMessage.objects.create)(
-            user=self.user,
+    async def send_heartbeats(self):
+        """
+        keeps the study session alive while the user is connected to it
+        """
+        heartbeat_interval = settings.STUDY_SESSION_IDLE_TIMEOUT / 3
+
+        while True:
+            try:
+                await atouch_study_session(self.session_code)
+            except RedisError:
+                # a failed heartbeat is retried at the next interval, the study session doesn't expire in the meantime
+                logger.exception(
+                    "Failed to touch the study session %s", self.session_code)
+
+            await asyncio.sleep(heartbeat_interval)
+
+    async def save_message(self, message, create):
+        # the message is saved later, together with other messages, so the broadcast doesn't wait for the database
+        message_buffer.add(StudySessionMessage(
+            user_id=self.user.id,
             group_name=self.session_group_name,
-            message_content=message
-        )
+            message_content=message,
+            create=create
+        ))
+
+        # the most recent messages are also kept in redis, so the chat history can be loaded without the database
+        await apush_study_session_message(self.session_code, {
+            'create': create,
+            'message_content': message,
+            'user_id': self.user.id,
+            'user__username': self.user.username
+        })
 
     async def receive(self, text_data):
         text_data_json = json.loads(text_data)
         message = text_data_json["message"]
         profile_picture_url = text_data_json["profile_picture_url"]
 
-        await self.save_message(message)
-
         sender = self.user.username
-        datetime = timezone.now().isoformat()
+        create = timezone.now()
+        datetime = create.isoformat()
 
         await self.channel_layer.group_send(
             self.session_group_name, {
                 "type": "chat.message", "message": message, "sender": sender, "datetime": datetime, "profile_picture_url": profile_picture_url}
         )
 
+        await self.save_message(message, create)
+
     async def chat_message(self, event):
         message = event["message"]
         sender = event["sender"]
         received_datetime = event["datetime"]
         profile_picture_url = event["profile_picture_url"]
 
-        await sync_to_async(timezone.activate)(self.tzname)
-
         received_datetime = datetimeClass.fromisoformat(received_datetime)
 
-        datetime = timezone.localtime(received_datetime).isoformat()
+        datetime = received_datetime.astimezone(self.tzinfo).isoformat()
 
         await self.send(text_data=json.dumps({"message": message, "sender": sender, "datetime": datetime, "profile_picture_url": profile_picture_url}))
@@ -1,5 +1,12 @@
 from django.shortcuts import redirect
 from django.contrib import messages
+from django.http import JsonResponse
+from .utils import get_rate_limit_key, consume_rate_limit_token
+from .models import UserProfile
+from django.contrib.auth.models import User
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+import math
+import json
 
 
 def login_required_restrictive(view):
@@ -19,6 +26,14 @@ def ajax_request_required(view):
     """
     decorator for views that checks that the request includes headers of an Ajax request 
     """
+    if iscoroutinefunction(view):
+        async def async_wrapper(request, *args, **kwargs):
+            if request.headers.get('X-Requested-With') != 'XMLHttpRequest':
+                return redirect('/404')
+            return await view(request, *args, **kwargs)
+
+        return markcoroutinefunction(async_wrapper)
+
     def wrapper(request, *args, **kwargs):
         if request.headers.get('X-Requested-With') != 'XMLHttpRequest':
             return redirect('/404')
@@ -27,10 +42,69 @@ def ajax_request_required(view):
     return wrapper
 
 
+def rate_limit(scope: str, capacity: int, refill_rate: float):
+    """
+    decorator for views that limits the requests with a token bucket for the client IP address
+    and another one for the email from the request body (if there is any)
+    every bucket allows bursts of capacity requests and refill_rate requests per second afterwards
+    """
+    def decorator(view):
+        def wrapper(request, *args, **kwargs):
+            bucket_keys = [get_rate_limit_key(
+                scope, "ip:" + request.META.get('REMOTE_ADDR', ''))]
+
+            email = request.POST.get('email')
+            if not email and request.content_type == 'application/json':
+                try:
+                    email = json.loads(request.body).get('email')
+                except (ValueError, AttributeError):
+                    email = None
+
+            if email:
+                bucket_keys.append(get_rate_limit_key(
+                    scope, "email:" + str(email).lower()))
+
+            retry_after = consume_rate_limit_token(
+                bucket_keys, capacity, refill_rate)
+            if retry_after:
+                response = JsonResponse({
+                    'message': f'Too many requests! Please try again in {math.ceil(retry_after)} seconds.'
+                }, status=429)
+                response['Retry-After'] = str(math.ceil(retry_after))
+                return response
+
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
 def country_required(view):
     """
     decorator for views that checks that the user has a country selected
     """
+    if iscoroutinefunction(view):
+        async def async_wrapper(request, *args, **kwargs):
+            user = await request.auser()
+
+            # the user profile may have been fetched already (by the timezone middleware)
+            if not User.user_profile.is_cached(user):
+                # the user profile is cached on the user, so it isn't fetched again by the view or the templates
+                user.user_profile = await UserProfile.objects.aget(user_id=user.id)
+
+            # the lazy request.user would fetch the user again (synchronously) when it is used by the view or the templates
+            request.user = user
+
+            if not user.user_profile.country:
+                messages.error(
+                    request, "The page you are trying to access requires to have a country selected")
+                return redirect('/404')
+
+            return await view(request, *args, **kwargs)
+
+        return markcoroutinefunction(async_wrapper)
+
     def wrapper(request, *args, **kwargs):
         if not request.user.user_profile.country:
             messages.error(
@@ -5,6 +5,7 @@ from django import forms
 from .models import UserProfile, Task, FlashcardsFolder, Flashcard
 from .validators import *
 from .middleware import COUNTRY_TIMEZONES
+from .utils import FLASHCARDS_FILE_CONTENT_TYPES, get_flashcards_file_format
 from django.utils import timezone
 import string
 
@@ -305,3 +306,30 @@ class FlashcardForm(forms.ModelForm):
             return None
 
         return folder
+
+
+class ImportFlashcardsForm(forms.Form):
+    """
+    class responsible with the flashcards import form (a csv, tsv or json file)
+    """
+    flashcards_file = forms.FileField(label="")
+
+    def clean_flashcards_file(self):
+        flashcards_file = self.cleaned_data['flashcards_file']
+
+        if get_flashcards_file_format(flashcards_file) not in FLASHCARDS_FILE_CONTENT_TYPES:
+            raise ValidationError(
+                "The flashcards file has to be a CSV, TSV or JSON file!")
+
+        return flashcards_file
+
+    def clean(self):
+        cleaned_data = super().clean()
+
+        flashcards_file = cleaned_data.get('flashcards_file')
+
+        if flashcards_file is not None:
+            cleaned_data['file_format'] = get_flashcards_file_format(
+                flashcards_file)
+
+        return cleaned_data
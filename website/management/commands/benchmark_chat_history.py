@@ -0,0 +1,96 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from website.benchmarks import QueriesCounter
+from website.models import StudySessionMessage, UserProfile
+from website.serializers import StudySessionMessageSerializer, StudySessionMessageValuesSerializer
+from website.utils import get_study_session_messages_page, get_profile_pictures_urls, delete_profile_picture_url
+import time
+
+BENCHMARK_SESSION_CODE = "benchmark"
+
+
+class Command(BaseCommand):
+    help = "Measures the cost of loading and serializing a page of a study session chat history, before and after the values() fast path"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=1000,
+                            help="Number of messages in the benchmark chat history")
+        parser.add_argument('--users', type=int, default=10,
+                            help="Number of users that sent the messages")
+        parser.add_argument('--page-size', type=int, default=10,
+                            help="Number of messages in a page")
+
+    def handle(self, *args, **options):
+        # the benchmark data is created in a transaction that is rolled back at the end
+        with transaction.atomic():
+            users = self.create_benchmark_data(
+                options['messages'], options['users'])
+
+            pages_number = options['messages'] // options['page_size']
+
+            self.report("model serializer (per-row queries)", self.run_model_serializer(
+                pages_number, options['page_size']), pages_number)
+            self.report("values serializer (cached urls)", self.run_values_serializer(
+                options['page_size']), pages_number)
+
+            transaction.set_rollback(True)
+
+        # the ids of the rolled back users can be reused, so their cached urls are deleted
+        for user in users:
+            delete_profile_picture_url(user.id)
+
+    def create_benchmark_data(self, messages_number: int, users_number: int) -> list:
+        users = [User.objects.create(username=f"benchmark_user_{user_index}")
+                 for user_index in range(users_number)]
+        UserProfile.objects.bulk_create(
+            [UserProfile(user=user) for user in users])
+
+        StudySessionMessage.objects.bulk_create([StudySessionMessage(
+            user=users[message_index % users_number],
+            group_name=f"study_session_{BENCHMARK_SESSION_CODE}",
+            message_content=f"benchmark message {message_index}"
+        ) for message_index in range(messages_number)], batch_size=1000)
+
+        return users
+
+    def run_model_serializer(self, pages_number: int, page_size: int) -> tuple:
+        queries_counter = QueriesCounter()
+        study_session_messages = StudySessionMessage.objects.filter(
+            group_name=f"study_session_{BENCHMARK_SESSION_CODE}").order_by("-create")
+
+        with connection.execute_wrapper(queries_counter):
+            start = time.perf_counter()
+            for page_index in range(pages_number):
+                loaded_messages = study_session_messages[page_index *
+                                                         page_size:(page_index + 1) * page_size]
+                StudySessionMessageSerializer(
+                    loaded_messages[::-1], many=True).data
+            duration = time.perf_counter() - start
+
+        return duration, queries_counter.queries_number
+
+    def run_values_serializer(self, page_size: int) -> tuple:
+        queries_counter = QueriesCounter()
+        with connection.execute_wrapper(queries_counter):
+            start = time.perf_counter()
+            messages_cursor = None
+            while True:
+                loaded_messages, messages_cursor = get_study_session_messages_page(
+                    BENCHMARK_SESSION_CODE, messages_cursor, page_size)
+                loaded_messages = loaded_messages[::-1]
+                profile_pictures_urls = get_profile_pictures_urls(
+                    message['user_id'] for message in loaded_messages)
+                StudySessionMessageValuesSerializer(
+                    loaded_messages, profile_pictures_urls).data
+
+                if messages_cursor is None:
+                    break
+            duration = time.perf_counter() - start
+
+        return duration, queries_counter.queries_number
+
+    def report(self, name: str, result: tuple, pages_number: int):
+        duration, queries_number = result
+        self.stdout.write(
+            f"{name}: {duration / pages_number * 1000:.3f} ms/page, {queries_number / pages_number:.1f} queries/page")
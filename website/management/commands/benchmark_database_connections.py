@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand
+from django.core import signals
+from django.db import connections
+from django.db.backends.signals import connection_created
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from channels.db import database_sync_to_async
+from website.models import StudySessionMessage
+import asyncio
+import gc
+import time
+
+
+class Command(BaseCommand):
+    help = "Measures the database connections opened on the study session chat path (database_sync_to_async calls) " \
+        "and on the HTTP path (sync views under the ASGI handler) for different CONN_MAX_AGE values"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=50,
+                            help="Number of concurrent study sessions (or concurrent HTTP clients)")
+        parser.add_argument('--calls', type=int, default=20,
+                            help="Number of database calls (or HTTP requests) made by every study session (or client)")
+        parser.add_argument('--conn-max-age', type=int, nargs='+', default=[0, 60],
+                            help="CONN_MAX_AGE values compared")
+        parser.add_argument('--paths', nargs='+', choices=['chat', 'http'], default=['chat', 'http'],
+                            help="Paths measured")
+
+    def handle(self, *args, **options):
+        opened_connections = []
+
+        def count_connection(sender, connection, **kwargs):
+            opened_connections.append(connection.alias)
+
+        connection_created.connect(count_connection)
+
+        # the connections created from now on use the modified settings
+        database_settings = connections.settings['default']
+        configured_conn_max_age = database_settings['CONN_MAX_AGE']
+
+        runners = {'chat': self.run_session, 'http': self.run_client}
+
+        try:
+            for path in options['paths']:
+                for conn_max_age in options['conn_max_age']:
+                    database_settings['CONN_MAX_AGE'] = conn_max_age
+                    connections.close_all()
+                    opened_connections.clear()
+
+                    start = time.perf_counter()
+                    asyncio.run(self.run_concurrently(
+                        runners[path], options['sessions'], options['calls']))
+                    duration = time.perf_counter() - start
+
+                    # the connections left open in the threads of the finished requests are closed when collected
+                    gc.collect()
+
+                    calls_number = options['sessions'] * options['calls']
+                    self.stdout.write(
+                        f"{path} CONN_MAX_AGE={conn_max_age}: {len(opened_connections)} connections opened for "
+                        f"{calls_number} calls ({duration / calls_number * 1000:.3f} ms/call)")
+        finally:
+            database_settings['CONN_MAX_AGE'] = configured_conn_max_age
+            connection_created.disconnect(count_connection)
+            connections.close_all()
+
+    async def run_concurrently(self, runner, runners_number: int, calls_number: int):
+        await asyncio.gather(*[runner(runner_index, calls_number)
+                               for runner_index in range(runners_number)])
+
+    async def run_session(self, session_index: int, calls_number: int):
+        # the same kind of call as the ones made by ChatConsumer (every call closes the obsolete connections)
+        for _ in range(calls_number):
+            await database_sync_to_async(StudySessionMessage.objects.filter(
+                group_name=f"study_session_benchmark_{session_index}").exists)()
+
+    async def run_client(self, client_index: int, calls_number: int):
+        # the same way as ASGIHandler runs a sync view: every request has its own thread sensitive context,
+        # so its sync code runs in a new thread, with its own database connection
+        for _ in range(calls_number):
+            async with ThreadSensitiveContext():
+                await sync_to_async(signals.request_started.send)(sender=self.__class__)
+                await sync_to_async(StudySessionMessage.objects.filter(
+                    group_name=f"study_session_benchmark_{client_index}").exists)()
+                await sync_to_async(signals.request_finished.send)(sender=self.__class__)
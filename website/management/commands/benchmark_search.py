@@ -0,0 +1,99 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import transaction
+from website.models import FlashcardsFolder, Flashcard, Task
+from website.search import fulltext_search_supported, index_documents, search_documents
+import random
+import statistics
+import time
+
+# the words of the benchmark texts are drawn from a vocabulary with a zipfian distribution (like the words of real texts)
+VOCABULARY_SIZE = 5000
+WORDS_PER_SIDE = 6
+
+
+class Command(BaseCommand):
+    help = "Measures the latency of the search (first and deeper pages) on a user with many flashcards and tasks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flashcards', type=int, default=100000,
+                            help="Number of flashcards of the benchmark user")
+        parser.add_argument('--tasks', type=int, default=5000,
+                            help="Number of tasks of the benchmark user")
+        parser.add_argument('--searches', type=int, default=20,
+                            help="Number of times every query is searched")
+        parser.add_argument('--page-size', type=int, default=20,
+                            help="Number of hits in a page")
+
+    def handle(self, *args, **options):
+        vocabulary = [f"term{word_index}" for word_index in range(VOCABULARY_SIZE)]
+        # the most frequent word is in about 80% of the flashcards (like a stopword), the rarest ones in a few of them
+        queries = {
+            'frequent term': vocabulary[0],
+            'medium term': vocabulary[100],
+            'rare term': vocabulary[3000],
+            'two terms': f"{vocabulary[0]} {vocabulary[100]}",
+            'three terms': f"{vocabulary[1]} {vocabulary[10]} {vocabulary[500]}",
+        }
+
+        # the benchmark data is created in a transaction that is rolled back at the end
+        with transaction.atomic():
+            start = time.perf_counter()
+            user = self.create_benchmark_data(
+                vocabulary, options['flashcards'], options['tasks'])
+            self.stdout.write(
+                f"Created {options['flashcards']} flashcards and {options['tasks']} tasks "
+                f"in {time.perf_counter() - start:.1f} s "
+                f"({'MySQL full-text indexes' if fulltext_search_supported() else 'inverted index'})")
+
+            for query_name, query in queries.items():
+                for page in (1, 5):
+                    self.report(f"{query_name}, page {page}", self.run_search(
+                        user.pk, query, page, options['page_size'], options['searches']))
+
+            transaction.set_rollback(True)
+
+    def create_benchmark_data(self, vocabulary: list, flashcards_number: int, tasks_number: int) -> User:
+        user = User.objects.create(username="benchmark_search_user")
+        folder = FlashcardsFolder.objects.create(
+            user=user, name="benchmark", flashcards_number=flashcards_number)
+
+        random_generator = random.Random(0)
+        words_weights = [1 / (word_rank + 1)
+                         for word_rank in range(len(vocabulary))]
+
+        def get_text() -> str:
+            return " ".join(random_generator.choices(vocabulary, words_weights, k=WORDS_PER_SIDE))
+
+        batch_size = 5000
+        for batch_start in range(0, flashcards_number, batch_size):
+            flashcards = Flashcard.objects.bulk_create([Flashcard(
+                user=user, folder=folder, front_side_text=get_text(), back_side_text=get_text())
+                for _ in range(min(batch_size, flashcards_number - batch_start))])
+            if not fulltext_search_supported():
+                index_documents('flashcard', flashcards)
+
+        tasks = Task.objects.bulk_create([Task(user=user, title=get_text(), description=get_text())
+                                          for _ in range(tasks_number)], batch_size=batch_size)
+        if not fulltext_search_supported():
+            index_documents('task', tasks)
+
+        return user
+
+    def run_search(self, user_id: int, query: str, page: int, page_size: int, searches_number: int) -> list:
+        # the first search warms up the caches of the database
+        search_documents(user_id, query, page, page_size)
+
+        durations = []
+        for _ in range(searches_number):
+            start = time.perf_counter()
+            search_documents(user_id, query, page, page_size)
+            durations.append(time.perf_counter() - start)
+
+        return durations
+
+    def report(self, name: str, durations: list):
+        durations = sorted(durations)
+        self.stdout.write(
+            f"{name}: median {statistics.median(durations) * 1000:.1f} ms, "
+            f"max {durations[-1] * 1000:.1f} ms")
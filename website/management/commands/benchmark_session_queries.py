@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from website.benchmarks import QueriesCounter
+from website.models import UserProfile
+
+BENCHMARK_URLS = [
+    '/main/',
+    '/main/to-do-list/?filter=all&page=1',
+    '/main/my-account/',
+    '/main/flashcards',
+]
+
+SESSION_ENGINES = [
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+    'django.contrib.sessions.backends.cache',
+]
+
+
+class Command(BaseCommand):
+    help = "Measures the number of database queries per authenticated request for every session engine"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help="Number of requests sent to every page")
+
+    def handle(self, *args, **options):
+        # the benchmark user is created in a transaction that is rolled back at the end
+        with transaction.atomic():
+            user = User.objects.create(username="benchmark_session_user")
+            UserProfile.objects.create(user=user, country="Romania")
+
+            for session_engine in SESSION_ENGINES:
+                with override_settings(SESSION_ENGINE=session_engine, ALLOWED_HOSTS=['testserver']):
+                    self.run_session_engine(
+                        session_engine, user, options['requests'])
+
+            transaction.set_rollback(True)
+
+    def run_session_engine(self, session_engine: str, user: User, requests_number: int):
+        client = Client()
+        client.force_login(user)
+
+        # the first request of every page warms up the caches (timezone, deadlines frequency)
+        for url in BENCHMARK_URLS:
+            client.get(url)
+
+        queries_counter = QueriesCounter()
+        session_queries_counter = QueriesCounter(table='django_session')
+
+        with connection.execute_wrapper(queries_counter), connection.execute_wrapper(session_queries_counter):
+            for _ in range(requests_number):
+                for url in BENCHMARK_URLS:
+                    client.get(url)
+
+        client.logout()
+
+        sent_requests_number = requests_number * len(BENCHMARK_URLS)
+        self.stdout.write(
+            f"{session_engine}: {queries_counter.queries_number / sent_requests_number:.2f} queries/request "
+            f"({session_queries_counter.queries_number / sent_requests_number:.2f} on django_session)")
@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Q
+from django.utils import timezone
+from website.models import Task, StudySessionMessage, FriendRequest, Friendship, Flashcard, SearchIndexEntry
+from website.utils import filter_tasks_by_deadline_date, get_deadline_dates
+import re
+
+
+# the queries that are executed on the hot paths of the website
+# the values used in filters are placeholders, the plan of a query doesn't depend on the existence of the rows
+HOT_QUERIES = {
+    'to-do list (filter)': lambda: Task.objects.filter(
+        user_id=1, is_complete=False),
+    'to-do list (deadline over)': lambda: Task.objects.filter(
+        user_id=1, is_complete=False, deadline__lt=timezone.now()),
+    'to-do list (deadline date)': lambda: filter_tasks_by_deadline_date(
+        Task.objects.filter(user_id=1, is_complete=False), timezone.localdate().isoformat(), "day"),
+    'main page (deadlines frequency)': lambda: get_deadline_dates(1, settings.TIME_ZONE),
+    'pending friend requests': lambda: FriendRequest.objects.filter(
+        receiver_id=1, status='pending'),
+    'friendship check': lambda: Friendship.objects.filter(
+        user_1_id=1, user_2_id=2),
+    'friend request between two users': lambda: FriendRequest.objects.filter(
+        Q(sender_id=1, receiver_id=2) | Q(sender_id=2, receiver_id=1)),
+    'study session messages page': lambda: StudySessionMessage.objects.filter(
+        group_name='study_session_code').order_by('-create', '-pk')[:11],
+    'study session messages page (cursor)': lambda: StudySessionMessage.objects.filter(
+        Q(create__lte=timezone.now()), Q(create__lt=timezone.now()) | Q(pk__lt=1),
+        group_name='study_session_code').order_by('-create', '-pk')[:11],
+    'folder flashcards page': lambda: Flashcard.objects.filter(
+        folder_id=1).order_by('pk')[:41],
+    'folder flashcards page (cursor)': lambda: Flashcard.objects.filter(
+        folder_id=1, pk__gt=1).order_by('pk')[:41],
+    'due flashcards of a folder': lambda: Flashcard.objects.filter(
+        folder_id=1, due_at__lte=timezone.now()).order_by('due_at')[:20],
+    'due flashcards of a user': lambda: Flashcard.objects.filter(
+        user_id=1, due_at__lte=timezone.now()).order_by('due_at')[:20],
+    'search (inverted index, one term)': lambda: SearchIndexEntry.objects.filter(
+        user_id=1, term='term').order_by('-weight', '-document_type', '-document_id')[:21],
+    'search (inverted index, several terms)': lambda: SearchIndexEntry.objects.filter(
+        user_id=1, term__in=['term', 'other']).values('document_type', 'document_id').annotate(
+            matched_terms=Count('id')).order_by('-matched_terms')[:21],
+}
+
+# markers of a full table scan in the EXPLAIN output of every supported database backend
+FULL_SCAN_PATTERNS = {
+    'mysql': re.compile(r"Table scan on"),
+    'sqlite': re.compile(r"\bSCAN (?!CONSTANT ROW)"),
+    'postgresql': re.compile(r"Seq Scan on"),
+}
+
+
+class Command(BaseCommand):
+    help = "Runs EXPLAIN for every hot query of the website and fails if any of them does a full table scan"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans', action='store_true', help="Print the query plan of every hot query")
+
+    def handle(self, *args, **options):
+        full_scan_pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if full_scan_pattern is None:
+            raise CommandError(
+                f"The query plans can't be checked for the database backend: {connection.vendor}")
+
+        failed_queries = []
+        for query_name, get_queryset in HOT_QUERIES.items():
+            query_plan = get_queryset().explain()
+
+            if options['verbose_plans']:
+                self.stdout.write(f"{query_name}:\n{query_plan}\n")
+
+            if full_scan_pattern.search(query_plan):
+                failed_queries.append(query_name)
+                self.stdout.write(self.style.ERROR(
+                    f"FULL SCAN  {query_name}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"OK         {query_name}"))
+
+        if failed_queries:
+            raise CommandError(
+                f"{len(failed_queries)} hot queries do a full table scan: {', '.join(failed_queries)}")
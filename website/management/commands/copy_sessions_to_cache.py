@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from importlib import import_module
+
+
+class Command(BaseCommand):
+    help = "Copies the unexpired sessions stored in the database to the sessions cache (migration to a cache session engine)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Number of sessions written to the cache in a batch")
+        parser.add_argument('--delete', action='store_true',
+                            help="Delete the copied sessions from the database")
+
+    def handle(self, *args, **options):
+        session_store_class = import_module(settings.SESSION_ENGINE).SessionStore
+        if not hasattr(session_store_class, 'cache_key_prefix'):
+            raise CommandError(
+                f"The session engine {settings.SESSION_ENGINE} doesn't store the sessions in a cache")
+
+        sessions_cache = caches[settings.SESSION_CACHE_ALIAS]
+        current_datetime = timezone.now()
+        copied_sessions_number = 0
+
+        sessions = Session.objects.filter(expire_date__gt=current_datetime)
+        batch = {}
+        for session in sessions.iterator(chunk_size=options['batch_size']):
+            cache_key = session_store_class.cache_key_prefix + session.session_key
+            # the timeouts are rounded down to minutes, so the sessions can be written in groups with the same timeout
+            timeout = int((session.expire_date -
+                          current_datetime).total_seconds()) // 60 * 60
+            if timeout == 0:
+                continue
+
+            batch[cache_key] = (session.get_decoded(), timeout)
+
+            if len(batch) >= options['batch_size']:
+                copied_sessions_number += self.write_batch(
+                    sessions_cache, batch)
+
+        copied_sessions_number += self.write_batch(sessions_cache, batch)
+
+        if options['delete']:
+            sessions.delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Copied {copied_sessions_number} sessions to the '{settings.SESSION_CACHE_ALIAS}' cache"))
+
+    def write_batch(self, sessions_cache, batch: dict) -> int:
+        # set_many accepts a single timeout, so the sessions are grouped by their timeout
+        sessions_by_timeout = {}
+        for cache_key, (session_data, timeout) in batch.items():
+            sessions_by_timeout.setdefault(timeout, {})[
+                cache_key] = session_data
+
+        for timeout, sessions_data in sessions_by_timeout.items():
+            sessions_cache.set_many(sessions_data, timeout=timeout)
+
+        batch_size = len(batch)
+        batch.clear()
+
+        return batch_size
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from website.utils import reap_idle_study_sessions
+
+
+class Command(BaseCommand):
+    help = "Removes the study sessions that expired (idle for more than STUDY_SESSION_IDLE_TIMEOUT seconds) and their chat history"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help="Number of study sessions removed in a batch")
+
+    def handle(self, *args, **options):
+        removed_sessions_number = reap_idle_study_sessions(
+            options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {removed_sessions_number} expired study sessions"))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from website.search import fulltext_search_supported, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the search index of the flashcards and the tasks (used by the databases without full-text indexes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help="Number of documents indexed at a time")
+
+    def handle(self, *args, **options):
+        if fulltext_search_supported():
+            self.stdout.write(self.style.SUCCESS(
+                "The search uses the MySQL full-text indexes, which are kept up to date by the database"))
+            return
+
+        indexed_documents_number = rebuild_search_index(options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {indexed_documents_number} flashcards and tasks"))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from website.utils import recount_folders_flashcards_number
+
+
+class Command(BaseCommand):
+    help = "Recomputes the flashcards number of every folder (repairs the counters that drifted from the real number of flashcards)"
+
+    def handle(self, *args, **options):
+        updated_folders_number = recount_folders_flashcards_number()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated the flashcards number of {updated_folders_number} folders"))
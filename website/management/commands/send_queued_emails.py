@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from website.utils import send_queued_emails, requeue_due_emails, requeue_processing_emails
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# the delay after an error of the worker (e.g. redis unavailable) doubles after every consecutive error, up to the maximum
+ERROR_RETRY_DELAY = 1
+MAX_ERROR_RETRY_DELAY = 60
+
+
+class Command(BaseCommand):
+    help = "Sends in batches the emails from the outbox (retrying the failed ones with exponential backoff)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.EMAIL_QUEUE_BATCH_SIZE,
+                            help="Number of emails sent through one connection of the email backend")
+        parser.add_argument('--wait-timeout', type=float, default=5,
+                            help="Number of seconds to wait for new emails before checking the failed emails again")
+        parser.add_argument('--once', action='store_true',
+                            help="Send the emails currently in the outbox and exit")
+
+    def handle(self, *args, **options):
+        # the emails taken by a previous worker which stopped before handling them
+        requeued_emails_number = requeue_processing_emails()
+        if requeued_emails_number:
+            self.stdout.write(
+                f"Moved back in the outbox {requeued_emails_number} emails left in processing")
+
+        if options['once']:
+            requeue_due_emails()
+
+            sent_emails_number = 0
+            failed_emails_number = 0
+            while True:
+                sent, failed = send_queued_emails(options['batch_size'])
+                if not sent and not failed:
+                    break
+
+                sent_emails_number += sent
+                failed_emails_number += failed
+
+            self.stdout.write(self.style.SUCCESS(
+                f"Sent {sent_emails_number} emails ({failed_emails_number} failed)"))
+            return
+
+        self.stdout.write("Sending the queued emails...")
+        error_retry_delay = ERROR_RETRY_DELAY
+        failed_batch = False
+        while True:
+            try:
+                # the emails of a failed batch are sent again
+                if failed_batch:
+                    requeue_processing_emails()
+                    failed_batch = False
+
+                requeue_due_emails()
+                sent, failed = send_queued_emails(
+                    options['batch_size'], options['wait_timeout'])
+            except Exception:
+                # the worker keeps running, the emails of the failed batch are still in the processing list
+                logger.exception(
+                    "Sending the queued emails failed, retrying in %s seconds", error_retry_delay)
+                failed_batch = True
+
+                time.sleep(error_retry_delay)
+                error_retry_delay = min(
+                    error_retry_delay * 2, MAX_ERROR_RETRY_DELAY)
+                continue
+
+            error_retry_delay = ERROR_RETRY_DELAY
+
+            if sent or failed:
+                self.stdout.write(f"Sent {sent} emails ({failed} failed)")
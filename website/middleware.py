@@ -1,4 +1,6 @@
 from django.utils import timezone
+from django.core.cache import cache
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 
 COUNTRY_TIMEZONES = {
     "Albania": "Europe/Tirane",
@@ -53,26 +55,112 @@ COUNTRY_TIMEZONES = {
 }
 
 
+def get_timezone_name_key(user_id: int) -> str:
+    """
+    method that returns the cache key under which the timezone name of a user is stored
+    """
+    return f"timezone:{user_id}"
+
+
+def get_user_timezone_name(user) -> str:
+    """
+    method that returns the name of the timezone of the user country ('UTC' for the users without a selected country)
+    the name is stored in cache memory until the user profile is updated, so the user profile is not queried on every request
+    """
+    record_key = get_timezone_name_key(user.id)
+
+    tzname = cache.get(record_key)
+    if tzname is None:
+        user_profile = user.user_profile  # every user has an associated user_profile
+        tzname = get_country_timezone_name(user_profile.country)
+
+        cache.set(record_key, tzname, timeout=None)
+
+    return tzname
+
+
+async def aget_user_timezone_name(user) -> str:
+    """
+    async version of get_user_timezone_name
+    """
+    from .models import UserProfile
+
+    record_key = get_timezone_name_key(user.id)
+
+    tzname = await cache.aget(record_key)
+    if tzname is None:
+        # the user profile is cached on the user, so it isn't fetched again by the view
+        user.user_profile = await UserProfile.objects.aget(user_id=user.id)
+        tzname = get_country_timezone_name(user.user_profile.country)
+
+        await cache.aset(record_key, tzname, timeout=None)
+
+    return tzname
+
+
+def get_country_timezone_name(user_country: str) -> str:
+    """
+    method that returns the name of the timezone of a country
+
+    user_country: a valid country or an empty string (user doesn't have a selected country)
+    """
+    if user_country in COUNTRY_TIMEZONES:
+        return COUNTRY_TIMEZONES.get(user_country)
+
+    return 'UTC'  # default timezone for users that doesn't have a selected country
+
+
+def delete_user_timezone_name(user_id: int):
+    """
+    method that deletes from cache memory the timezone name of a user
+    this method is intended to be called every time the user profile is updated
+    """
+    cache.delete(get_timezone_name_key(user_id))
+
+
 class TimezoneMiddleware:
+    # under daphne the middleware runs on the event loop, so the async views aren't moved to a thread
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
         user = request.user
         if user.is_authenticated:
-            user_profile = user.user_profile  # every user has an associated user_profile
-            # user_country can be a valid country or an empty string (user doesn't have a selected country)
-            user_country = user_profile.country
-
-            if user_country in COUNTRY_TIMEZONES:
-                tzname = COUNTRY_TIMEZONES.get(user_country)
-            else:
-                tzname = 'UTC'  # default timezone for users that doesn't have a selected country
+            tzname = get_user_timezone_name(user)
 
             timezone.activate(tzname)
-            request.session['django_timezone'] = tzname
+
+            # the session is modified (and saved) only when the timezone changes
+            if request.session.get('django_timezone') != tzname:
+                request.session['django_timezone'] = tzname
 
         else:
             timezone.deactivate()
 
         return self.get_response(request)
+
+    async def __acall__(self, request):
+        user = await request.auser()
+        # the lazy request.user would query the database again (synchronously) when it is used by views or templates
+        request.user = user
+
+        if user.is_authenticated:
+            tzname = await aget_user_timezone_name(user)
+
+            timezone.activate(tzname)
+
+            if await request.session.aget('django_timezone') != tzname:
+                await request.session.aset('django_timezone', tzname)
+
+        else:
+            timezone.deactivate()
+
+        return await self.get_response(request)
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0020_flashcard'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'is_complete', 'deadline'], name='task_user_complete_deadline'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0021_task_user_complete_deadline_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='friendrequest',
+            index=models.Index(fields=['receiver', 'status'], name='friend_request_receiver_status'),
+        ),
+        migrations.AddIndex(
+            model_name='friendship',
+            index=models.Index(fields=['user_1', 'user_2'], name='friendship_users'),
+        ),
+        migrations.AddIndex(
+            model_name='studysessionmessage',
+            index=models.Index(fields=['group_name', '-create'], name='message_group_create'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def canonicalize_friendships(apps, schema_editor):
+    """
+    stores every friendship with the pair of users in canonical order (user_1 has the smaller id)
+    and deletes the duplicated friendships (the oldest friendship between two users is kept)
+    """
+    Friendship = apps.get_model('website', 'Friendship')
+
+    saved_pairs = set()
+    duplicated_friendships_pks = []
+    swapped_friendships = []
+
+    for friendship in Friendship.objects.order_by('create', 'pk').iterator():
+        user_1_id, user_2_id = sorted(
+            (friendship.user_1_id, friendship.user_2_id))
+
+        if (user_1_id, user_2_id) in saved_pairs:
+            duplicated_friendships_pks.append(friendship.pk)
+            continue
+
+        saved_pairs.add((user_1_id, user_2_id))
+
+        if friendship.user_1_id != user_1_id:
+            friendship.user_1_id = user_1_id
+            friendship.user_2_id = user_2_id
+            swapped_friendships.append(friendship)
+
+    Friendship.objects.filter(pk__in=duplicated_friendships_pks).delete()
+    Friendship.objects.bulk_update(
+        swapped_friendships, ['user_1', 'user_2'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0022_hot_queries_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(canonicalize_friendships,
+                             migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='friendship',
+            name='friendship_users',
+        ),
+        migrations.AddConstraint(
+            model_name='friendship',
+            constraint=models.UniqueConstraint(fields=('user_1', 'user_2'), name='friendship_unique_users'),
+        ),
+        migrations.AddConstraint(
+            model_name='friendship',
+            constraint=models.CheckConstraint(condition=models.Q(('user_1__lt', models.F('user_2'))), name='friendship_ordered_users'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0023_friendship_canonical_pair'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='studysessionmessage',
+            name='message_group_create',
+        ),
+        migrations.AddIndex(
+            model_name='studysessionmessage',
+            index=models.Index(fields=['group_name', '-create', '-id'], name='message_group_create_id'),
+        ),
+    ]
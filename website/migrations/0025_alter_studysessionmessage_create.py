@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0024_message_group_create_id_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studysessionmessage',
+            name='create',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:18
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0025_alter_studysessionmessage_create'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flashcard',
+            name='due_at',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='flashcard',
+            name='ease_factor',
+            field=models.FloatField(blank=True, default=2.5),
+        ),
+        migrations.AddField(
+            model_name='flashcard',
+            name='interval',
+            field=models.PositiveIntegerField(blank=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='flashcard',
+            name='last_reviewed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='flashcard',
+            name='repetitions',
+            field=models.PositiveIntegerField(blank=True, default=0),
+        ),
+        migrations.AddIndex(
+            model_name='flashcard',
+            index=models.Index(fields=['user', 'due_at'], name='flashcard_user_due_at'),
+        ),
+        migrations.AddIndex(
+            model_name='flashcard',
+            index=models.Index(fields=['folder', 'due_at'], name='flashcard_folder_due_at'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# full-text indexes used by the search on MySQL (the other databases use the SearchIndexEntry inverted index)
+FULLTEXT_INDEXES = [
+    ('website_flashcard', 'flashcard_text_fulltext',
+     ['front_side_text', 'back_side_text']),
+    ('website_task', 'task_text_fulltext', ['title', 'description']),
+]
+
+
+def add_fulltext_indexes(apps, schema_editor):
+    """
+    creates the full-text indexes of the flashcards and the tasks texts (just on MySQL)
+    """
+    if schema_editor.connection.vendor != 'mysql':
+        return
+
+    quote_name = schema_editor.quote_name
+    for table_name, index_name, columns in FULLTEXT_INDEXES:
+        schema_editor.execute(
+            f"ALTER TABLE {quote_name(table_name)} ADD FULLTEXT INDEX {quote_name(index_name)} "
+            f"({', '.join(quote_name(column) for column in columns)})")
+
+
+def remove_fulltext_indexes(apps, schema_editor):
+    """
+    drops the full-text indexes of the flashcards and the tasks texts (just on MySQL)
+    """
+    if schema_editor.connection.vendor != 'mysql':
+        return
+
+    quote_name = schema_editor.quote_name
+    for table_name, index_name, _ in FULLTEXT_INDEXES:
+        schema_editor.execute(
+            f"ALTER TABLE {quote_name(table_name)} DROP INDEX {quote_name(index_name)}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0026_flashcard_review_state'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchIndexEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('document_type', models.CharField(choices=[('flashcard', 'Flashcard'), ('task', 'Task')], max_length=16)),
+                ('document_id', models.PositiveBigIntegerField()),
+                ('weight', models.PositiveIntegerField(blank=True, default=1)),
+                ('user', models.ForeignKey(blank=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'term'], name='search_entry_user_term'), models.Index(fields=['document_type', 'document_id'], name='search_entry_document')],
+            },
+        ),
+        migrations.RunPython(add_fulltext_indexes, remove_fulltext_indexes),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0027_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='searchindexentry',
+            index=models.Index(fields=['user', 'term', 'weight', 'document_type', 'document_id'], name='search_entry_term_ranking'),
+        ),
+        migrations.RemoveIndex(
+            model_name='searchindexentry',
+            name='search_entry_user_term',
+        ),
+    ]
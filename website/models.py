@@ -3,6 +3,7 @@ from django.contrib.auth.models import User
 from cloudinary_storage.storage import MediaCloudinaryStorage
 from django.core.validators import FileExtensionValidator
 from django.db.models import F
+from django.utils import timezone
 
 
 class UserProfile(models.Model):
@@ -42,6 +43,11 @@ class Task(models.Model):
         # setting a priority to the tasks that are not completed yet
         # the tasks that are marked as completed will be shown in the bottom section of the tasks list
         ordering = ['is_complete', F('deadline').asc(nulls_last=True)]
+        indexes = [
+            # used by the to-do list filters (the deadline filter is a range query on this index)
+            models.Index(fields=['user', 'is_complete', 'deadline'],
+                         name='task_user_complete_deadline'),
+        ]
 
 
 class StudySessionMessage(models.Model):
@@ -53,8 +59,9 @@ class StudySessionMessage(models.Model):
     )
     group_name = models.CharField(max_length=30, null=False, blank=True)
     message_content = models.TextField(null=False, blank=True)
+    # the creation datetime is set when the message is received, not when it is saved (the messages are saved in batches)
     create = models.DateTimeField(
-        auto_now_add=True, null=False, blank=True
+        default=timezone.now, editable=False, null=False, blank=True
     )
 
     def __str__(self):
@@ -62,6 +69,11 @@ class StudySessionMessage(models.Model):
 
     class Meta:
         ordering = ['create']
+        indexes = [
+            # used by the study session chat history (the newest messages of a session are loaded first)
+            models.Index(fields=['group_name', '-create', '-id'],
+                         name='message_group_create_id'),
+        ]
 
 
 class FriendRequest(models.Model):
@@ -88,11 +100,18 @@ class FriendRequest(models.Model):
     def __str__(self):
         return f"Request sent by {self.sender} to {self.receiver} has the status: {self.status}"
 
+    class Meta:
+        indexes = [
+            # used for counting and listing the pending friend requests received by a user
+            models.Index(fields=['receiver', 'status'],
+                         name='friend_request_receiver_status'),
+        ]
+
 
 class Friendship(models.Model):
     """
     class responsible with the details about a friendship between two users
-    the friendship is bidirectional
+    the friendship is bidirectional, so the pair of users is stored in canonical order (user_1 has the smaller id)
     """
 
     user_1 = models.ForeignKey(
@@ -106,6 +125,21 @@ class Friendship(models.Model):
     def __str__(self):
         return f"{self.user_1.username} is friend with {self.user_2.username}"
 
+    def save(self, *args, **kwargs):
+        if self.user_1_id > self.user_2_id:
+            self.user_1_id, self.user_2_id = self.user_2_id, self.user_1_id
+
+        super().save(*args, **kwargs)
+
+    class Meta:
+        constraints = [
+            # the unique constraint is also the index used for checking if two users are friends
+            models.UniqueConstraint(fields=['user_1', 'user_2'],
+                                    name='friendship_unique_users'),
+            models.CheckConstraint(condition=models.Q(user_1__lt=F('user_2')),
+                                   name='friendship_ordered_users'),
+        ]
+
 
 class FlashcardsFolder(models.Model):
     """
@@ -136,5 +170,56 @@ class Flashcard(models.Model):
     back_side_text = models.TextField(null=False, blank=False)
     create = models.DateTimeField(auto_now_add=True, null=False, blank=True)
 
+    # spaced repetition review state (SM-2 algorithm), updated after every review of the flashcard
+    # a new flashcard is due right away
+    ease_factor = models.FloatField(default=2.5, null=False, blank=True)
+    interval = models.PositiveIntegerField(
+        default=0, null=False, blank=True)  # days until the next review
+    repetitions = models.PositiveIntegerField(
+        default=0, null=False, blank=True)  # successful reviews in a row
+    due_at = models.DateTimeField(
+        default=timezone.now, null=False, blank=True)
+    last_reviewed_at = models.DateTimeField(null=True, blank=True)
+
     def __str__(self):
         return self.front_side_text
+
+    class Meta:
+        indexes = [
+            # used by the review sessions (the next due flashcards of a user or of a folder are a range scan)
+            models.Index(fields=['user', 'due_at'],
+                         name='flashcard_user_due_at'),
+            models.Index(fields=['folder', 'due_at'],
+                         name='flashcard_folder_due_at'),
+        ]
+
+
+class SearchIndexEntry(models.Model):
+    """
+    class responsible with the inverted index used for searching the flashcards and the tasks of a user
+    when the database has no full-text index (every entry is a term of a flashcard or of a task)
+    """
+    DOCUMENT_TYPES = [
+        ('flashcard', 'Flashcard'),
+        ('task', 'Task'),
+    ]
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, null=False, blank=True)
+    term = models.CharField(max_length=64, null=False, blank=False)
+    document_type = models.CharField(
+        max_length=16, choices=DOCUMENT_TYPES, null=False, blank=False)
+    document_id = models.PositiveBigIntegerField(null=False, blank=False)
+    # number of occurrences of the term in the document
+    weight = models.PositiveIntegerField(default=1, null=False, blank=True)
+
+    class Meta:
+        indexes = [
+            # covering index of the search (the documents of a user containing the searched terms),
+            # the documents of a single term are read already ranked by weight
+            models.Index(fields=['user', 'term', 'weight', 'document_type', 'document_id'],
+                         name='search_entry_term_ranking'),
+            # used for removing the entries of a document when it is updated or deleted
+            models.Index(fields=['document_type', 'document_id'],
+                         name='search_entry_document'),
+        ]
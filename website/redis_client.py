@@ -0,0 +1,67 @@
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+import asyncio
+import weakref
+
+# in-process redis server used when the default cache is not a redis cache (local development and tests)
+_local_redis_server = None
+_local_redis_client = None
+
+# the asyncio clients can't be shared between event loops (their connections are bound to the loop that opened them)
+_async_redis_clients = weakref.WeakKeyDictionary()
+
+
+def _get_local_redis_server():
+    global _local_redis_server
+
+    if _local_redis_server is None:
+        import fakeredis
+        _local_redis_server = fakeredis.FakeServer()
+
+    return _local_redis_server
+
+
+def get_redis_client():
+    """
+    returns a client for the redis server behind the default cache
+    the client gives access to the native redis data structures (sets, lists, counters), which are not exposed by the cache API
+
+    when the default cache is not a redis cache, a client for an in-process fakeredis server is returned
+    """
+    global _local_redis_client
+
+    default_cache = caches['default']
+    if isinstance(default_cache, RedisCache):
+        return default_cache._cache.get_client(write=True)
+
+    if _local_redis_client is None:
+        import fakeredis
+        _local_redis_client = fakeredis.FakeRedis(
+            server=_get_local_redis_server())
+
+    return _local_redis_client
+
+
+def get_async_redis_client():
+    """
+    returns an asyncio client for the same redis server as get_redis_client, to be used from async code
+    (the commands are awaited on the event loop instead of blocking a thread)
+    """
+    loop = asyncio.get_running_loop()
+
+    async_redis_client = _async_redis_clients.get(loop)
+    if async_redis_client is None:
+        default_cache = caches['default']
+        if isinstance(default_cache, RedisCache):
+            import redis.asyncio
+            # the first server is the one used by the cache for writing
+            async_redis_client = redis.asyncio.Redis.from_url(
+                default_cache._cache._servers[0])
+        else:
+            import fakeredis
+            async_redis_client = fakeredis.FakeAsyncRedis(
+                server=_get_local_redis_server())
+
+        _async_redis_clients[loop] = async_redis_client
+
+    return async_redis_client
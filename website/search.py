@@ -0,0 +1,196 @@
+from django.db import connection
+from django.db.models import Count, Sum
+from django.db.models.expressions import RawSQL
+from django.urls import reverse
+from .models import Flashcard, Task, SearchIndexEntry
+from collections import Counter
+import re
+
+# the searched terms are words with at least 3 characters (the minimum token size of the MySQL full-text indexes)
+SEARCH_TERM_MIN_LENGTH = 3
+SEARCH_TERM_MAX_LENGTH = 64
+
+# the texts of the searched documents, by document type
+SEARCH_DOCUMENTS_FIELDS = {
+    'flashcard': ['front_side_text', 'back_side_text'],
+    'task': ['title', 'description'],
+}
+
+SEARCH_WORD_PATTERN = re.compile(r"\w+")
+
+
+def fulltext_search_supported() -> bool:
+    """
+    helper function that checks if the database has full-text indexes for the searched documents (MySQL)
+    the other databases use the inverted index stored in SearchIndexEntry
+    """
+    return connection.vendor == 'mysql'
+
+
+def get_search_terms(text: str) -> list:
+    """
+    helper function that splits a text into the terms that are indexed and searched (lowercase words)
+    """
+    if not text:
+        return []
+
+    return [word[:SEARCH_TERM_MAX_LENGTH] for word in SEARCH_WORD_PATTERN.findall(text.lower())
+            if len(word) >= SEARCH_TERM_MIN_LENGTH]
+
+
+def index_documents(document_type: str, documents):
+    """
+    helper function that adds to the inverted index the terms of the given documents (flashcards or tasks)
+    the entries of a document have to be removed before the document is indexed again
+
+    documents: model instances of the given document type
+    """
+    entries = []
+    for document in documents:
+        # the tasks without user can't be searched, the documents without id weren't saved
+        if document.user_id is None or document.pk is None:
+            continue
+
+        text = " ".join(getattr(document, field) or ""
+                        for field in SEARCH_DOCUMENTS_FIELDS[document_type])
+        for term, weight in Counter(get_search_terms(text)).items():
+            entries.append(SearchIndexEntry(user_id=document.user_id, term=term, document_type=document_type,
+                                            document_id=document.pk, weight=weight))
+
+    SearchIndexEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+def remove_documents_from_index(document_type: str, documents_ids):
+    """
+    helper function that removes from the inverted index the terms of the given documents (flashcards or tasks)
+    """
+    SearchIndexEntry.objects.filter(
+        document_type=document_type, document_id__in=list(documents_ids)).delete()
+
+
+def get_fulltext_ranked_documents(user_id: int, query: str, documents_number: int) -> list:
+    """
+    helper function that returns the (score, document type, document id) of the best documents of a user matching a query,
+    using the MySQL full-text indexes (natural language mode), from the best match
+    """
+    ranked_documents = []
+    for document_type, model in (('flashcard', Flashcard), ('task', Task)):
+        table_name = connection.ops.quote_name(model._meta.db_table)
+        columns = ", ".join(f"{table_name}.{connection.ops.quote_name(field)}"
+                            for field in SEARCH_DOCUMENTS_FIELDS[document_type])
+
+        documents = model.objects.filter(user_id=user_id).annotate(
+            score=RawSQL(f"MATCH ({columns}) AGAINST (%s IN NATURAL LANGUAGE MODE)", (query,))
+        ).filter(score__gt=0).order_by('-score').values_list('score', 'id')[:documents_number]
+
+        ranked_documents.extend((score, document_type, document_id)
+                                for score, document_id in documents)
+
+    # the best documents of both types, merged by score
+    ranked_documents.sort(key=lambda document: -document[0])
+
+    return ranked_documents[:documents_number]
+
+
+def get_indexed_ranked_documents(user_id: int, search_terms: list, offset: int, documents_number: int) -> list:
+    """
+    helper function that returns the (score, document type, document id) of the best documents of a user matching the search terms,
+    using the inverted index, from the best match
+    the documents with more matched terms come first, then the ones where the terms occur more times
+    """
+    search_terms = set(search_terms)
+
+    # the documents of a single term are read in the order of the index, without aggregating all the matched entries
+    if len(search_terms) == 1:
+        documents = SearchIndexEntry.objects.filter(user_id=user_id, term=search_terms.pop()).order_by(
+            '-weight', '-document_type', '-document_id').values_list(
+                'document_type', 'document_id')[offset:offset + documents_number]
+
+        return [(1, document_type, document_id) for document_type, document_id in documents]
+
+    documents = SearchIndexEntry.objects.filter(user_id=user_id, term__in=search_terms).values(
+        'document_type', 'document_id').annotate(
+            matched_terms=Count('id'), occurrences=Sum('weight')
+    ).order_by('-matched_terms', '-occurrences', '-document_type', '-document_id')[offset:offset + documents_number]
+
+    return [(document['matched_terms'], document['document_type'], document['document_id'])
+            for document in documents]
+
+
+def search_documents(user_id: int, query: str, page: int, page_size: int) -> tuple:
+    """
+    helper function that searches the flashcards and the tasks of a user and returns a page of hits, ranked by relevance,
+    and True if there is a next page (False otherwise)
+    the hits are dictionaries with the type of the document, its id, its texts and the url of the page showing it
+    """
+    search_terms = get_search_terms(query)
+    if not search_terms:
+        return [], False
+
+    offset = (page - 1) * page_size
+
+    # one document more than the page size is fetched to find out if there is a next page
+    if fulltext_search_supported():
+        ranked_documents = get_fulltext_ranked_documents(
+            user_id, " ".join(search_terms), offset + page_size + 1)[offset:]
+    else:
+        ranked_documents = get_indexed_ranked_documents(
+            user_id, search_terms, offset, page_size + 1)
+
+    has_next_page = len(ranked_documents) > page_size
+    ranked_documents = ranked_documents[:page_size]
+
+    flashcards_ids = [document_id for _, document_type, document_id in ranked_documents
+                      if document_type == 'flashcard']
+    tasks_ids = [document_id for _, document_type, document_id in ranked_documents
+                 if document_type == 'task']
+
+    hits = {}
+    for flashcard in Flashcard.objects.filter(user_id=user_id, pk__in=flashcards_ids).values(
+            'id', 'front_side_text', 'back_side_text', 'folder__name'):
+        hits[('flashcard', flashcard['id'])] = {
+            'type': 'flashcard',
+            'id': flashcard['id'],
+            'front_side_text': flashcard['front_side_text'],
+            'back_side_text': flashcard['back_side_text'],
+            'folder_name': flashcard['folder__name'],
+            'url': reverse('folder', args=[flashcard['folder__name']]),
+        }
+
+    for task in Task.objects.filter(user_id=user_id, pk__in=tasks_ids).values('id', 'title', 'description'):
+        hits[('task', task['id'])] = {
+            'type': 'task',
+            'id': task['id'],
+            'title': task['title'],
+            'description': task['description'],
+            'url': reverse('update-task', args=[task['id']]),
+        }
+
+    # the hits keep the order of the ranking (a document deleted in the meantime is skipped)
+    return [hits[(document_type, document_id)] for _, document_type, document_id in ranked_documents
+            if (document_type, document_id) in hits], has_next_page
+
+
+def rebuild_search_index(batch_size: int = 2000) -> int:
+    """
+    helper function that builds again the whole inverted index from the flashcards and the tasks, in batches of documents,
+    and returns the number of indexed documents
+    """
+    SearchIndexEntry.objects.all().delete()
+
+    indexed_documents_number = 0
+    for document_type, model in (('flashcard', Flashcard), ('task', Task)):
+        documents = model.objects.filter(user__isnull=False).only(
+            'id', 'user_id', *SEARCH_DOCUMENTS_FIELDS[document_type]).order_by('id')
+
+        last_document_id = 0
+        while True:
+            documents_batch = list(documents.filter(id__gt=last_document_id)[:batch_size])
+            if not documents_batch:
+                break
+
+            index_documents(document_type, documents_batch)
+            indexed_documents_number += len(documents_batch)
+            last_document_id = documents_batch[-1].id
+
+    return indexed_documents_number
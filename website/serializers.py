@@ -2,6 +2,32 @@ from rest_framework import serializers
 from .models import StudySessionMessage
 from django.utils import timezone
 
+MONTHS = {
+    1: "Jan",
+    2: "Feb",
+    3: "Mar",
+    4: "Apr",
+    5: "May",
+    6: "Jun",
+    7: "Jul",
+    8: "Aug",
+    9: "Sep",
+    10: "Oct",
+    11: "Nov",
+    12: "Dec"
+}
+
+DEFAULT_PROFILE_PICTURE_URL = "https://robohash.org/default_profile_picture?set=set1&size=200x200"
+
+
+def format_message_datetime(create) -> str:
+    """
+    method that formats the creation datetime of a message from the study session chat in the active timezone
+    """
+    created_at = timezone.localtime(create)
+
+    return f"{created_at.day}  {MONTHS[created_at.month]}  {created_at.hour}:{created_at.minute}"
+
 
 class StudySessionMessageSerializer(serializers.ModelSerializer):
     """
@@ -26,29 +52,35 @@ class StudySessionMessageSerializer(serializers.ModelSerializer):
         if obj is None:
             return None
 
-        months = {
-            1: "Jan",
-            2: "Feb",
-            3: "Mar",
-            4: "Apr",
-            5: "May",
-            6: "Jun",
-            7: "Jul",
-            8: "Aug",
-            9: "Sep",
-            10: "Oct",
-            11: "Nov",
-            12: "Dec"
-        }
-
-        created_at = timezone.localtime(obj.create)
-        datetime = f"{created_at.day}  {months[created_at.month]}  {created_at.hour}:{created_at.minute}"
-
-        return datetime
+        return format_message_datetime(obj.create)
 
     def get_profile_picture_url(self, obj):
         if not obj.user.user_profile.profile_picture:
-            default_profile_picture = "https://robohash.org/default_profile_picture?set=set1&size=200x200"
-            return default_profile_picture
+            return DEFAULT_PROFILE_PICTURE_URL
 
         return obj.user.user_profile.profile_picture.url
+
+
+class StudySessionMessageValuesSerializer:
+    """
+    class responsible with the serialization of messages from the study session chat fetched with values()
+    (the dictionaries must contain the keys: user_id, user__username, message_content, create)
+
+    the serialized messages are plain dictionaries with the same fields as StudySessionMessageSerializer,
+    built without any model instance or query
+
+    profile_pictures_urls: dictionary with the profile picture url of every message sender (by user id)
+    """
+
+    def __init__(self, messages, profile_pictures_urls: dict):
+        self.messages = messages
+        self.profile_pictures_urls = profile_pictures_urls
+
+    @property
+    def data(self) -> list:
+        return [{
+            'sender': message['user__username'],
+            'message_content': message['message_content'],
+            'datetime': format_message_datetime(message['create']),
+            'profile_picture_url': self.profile_pictures_urls.get(message['user_id'], DEFAULT_PROFILE_PICTURE_URL)
+        } for message in self.messages]
@@ -0,0 +1,75 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Task, Flashcard, Friendship, UserProfile
+from .search import SEARCH_DOCUMENTS_FIELDS, fulltext_search_supported, index_documents, remove_documents_from_index
+from .utils import delete_deadlines_frequency, delete_friends_usernames, delete_profile_picture_url
+from .middleware import delete_user_timezone_name
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_deadlines_frequency(sender, instance, **kwargs):
+    """
+    deletes the cached deadlines frequency of the task owner every time one of his tasks is created, updated or deleted
+    the cache is invalidated after the commit, so a concurrent request can't cache the deadlines from before the change
+    """
+    user_id = instance.user_id
+    if user_id is not None:
+        transaction.on_commit(lambda: delete_deadlines_frequency(user_id))
+
+
+@receiver(post_save, sender=Friendship)
+@receiver(post_delete, sender=Friendship)
+def invalidate_friends_usernames(sender, instance, **kwargs):
+    """
+    deletes the cached friends of both users every time a friendship between them is created or deleted
+    the cache is invalidated after the commit, so a concurrent request can't cache the friends from before the change
+    """
+    transaction.on_commit(lambda: delete_friends_usernames(
+        instance.user_1_id, instance.user_2_id))
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_picture_url(sender, instance, **kwargs):
+    """
+    deletes the cached profile picture url of the user every time his profile is updated
+    """
+    delete_profile_picture_url(instance.user_id)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_user_timezone_name(sender, instance, **kwargs):
+    """
+    deletes the cached timezone name of the user every time his profile is updated (the country may have changed)
+    """
+    delete_user_timezone_name(instance.user_id)
+
+
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    """
+    indexes again the texts of a flashcard or a task every time it is saved (just when its texts may have changed)
+    """
+    document_type = 'flashcard' if sender is Flashcard else 'task'
+    if update_fields is not None and not set(update_fields) & set(SEARCH_DOCUMENTS_FIELDS[document_type]):
+        return
+
+    remove_documents_from_index(document_type, [instance.pk])
+    index_documents(document_type, [instance])
+
+
+def remove_from_search_index(sender, instance, **kwargs):
+    """
+    removes the texts of a flashcard or a task from the search index when it is deleted
+    """
+    remove_documents_from_index(
+        'flashcard' if sender is Flashcard else 'task', [instance.pk])
+
+
+# on MySQL the search uses the full-text indexes, which are kept up to date by the database
+if not fulltext_search_supported():
+    for document_model in (Flashcard, Task):
+        post_save.connect(update_search_index, sender=document_model)
+        post_delete.connect(remove_from_search_index, sender=document_model)
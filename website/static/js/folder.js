@@ -72,7 +72,9 @@ function openDeleteFlashcardConfirmation(flashcardId) {
                         flashcardElement.remove();
 
                         const flashcardParentElement = document.getElementById('flashcards-section');
-                        if (flashcardParentElement.querySelectorAll('div').length === 1) {
+                        // the folder is empty only if there are no flashcards left to be loaded either
+                        if (flashcardParentElement.querySelectorAll('div').length === 1 &&
+                            document.getElementById('loadMoreFlashcards') === null) {
                             const noFlashcardsElement = document.getElementById('no-flashcards');
                             noFlashcardsElement.style.display = 'block';
 
@@ -100,4 +102,91 @@ function openDeleteFlashcardConfirmation(flashcardId) {
                 )
         }
     });
-}
\ No newline at end of file
+}
+
+function createFlashcardElement(flashcard) {
+    const mainScriptElement = document.getElementById('folder-page-main-script');
+    const flashcardTemplate = document.getElementById('flashcardTemplate');
+    const flashcardElement = flashcardTemplate.content.firstElementChild.cloneNode(true);
+
+    flashcardElement.id = `flashcard-${flashcard.id}`;
+
+    // the urls from the script dataset are the urls of the flashcard with id 0
+    const updateFlashcardBtn = flashcardElement.querySelector('.update-flashcard');
+    updateFlashcardBtn.href = mainScriptElement.dataset.updateFlashcardUrl.replace(/0$/, flashcard.id);
+
+    const deleteFlashcardBtn = flashcardElement.querySelector('.delete-flashcard');
+    deleteFlashcardBtn.id = `deleteFlashcard${flashcard.id}Btn`;
+    deleteFlashcardBtn.dataset.deleteFlashcardUrl = mainScriptElement.dataset.deleteFlashcardUrl.replace(/0$/, flashcard.id);
+    deleteFlashcardBtn.addEventListener('click', () => openDeleteFlashcardConfirmation(flashcard.id));
+
+    // the actions of the new flashcards are shown if the actions of the loaded flashcards are shown
+    const showFlashcardsActionsBtn = document.getElementById('showFlashcardsActionsBtn');
+    if (showFlashcardsActionsBtn !== null && showFlashcardsActionsBtn.textContent === 'Hide Flashcards Actions') {
+        updateFlashcardBtn.style.display = 'block';
+        deleteFlashcardBtn.style.display = 'block';
+    }
+
+    flashcardElement.querySelector('.front-side-text').textContent = flashcard.front_side_text;
+    flashcardElement.querySelector('.back-side-text').textContent = flashcard.back_side_text;
+
+    return flashcardElement;
+}
+
+(function () {
+    const loadMoreFlashcardsElement = document.getElementById('loadMoreFlashcards');
+    if (loadMoreFlashcardsElement === null)
+        return;
+
+    let loadingFlashcards = false;
+
+    function loadNextFlashcardsPage() {
+        if (loadingFlashcards)
+            return;
+
+        loadingFlashcards = true;
+
+        const nextFlashcardsCursor = loadMoreFlashcardsElement.dataset.nextFlashcardsCursor;
+        const folderUrl = loadMoreFlashcardsElement.dataset.folderUrl;
+        const nextFlashcardsPageQueryUrl = folderUrl + "?flashcards-cursor=" + encodeURIComponent(nextFlashcardsCursor);
+
+        fetch(nextFlashcardsPageQueryUrl, {
+            headers: {
+                'X-Requested-With': 'XMLHttpRequest'
+            }
+        })
+            .then(response => response.json())
+            .then(data => {
+                const flashcardsSectionElement = document.getElementById('flashcards-section');
+                const noFlashcardsElement = document.getElementById('no-flashcards');
+
+                data.flashcards.forEach(flashcard => {
+                    flashcardsSectionElement.insertBefore(createFlashcardElement(flashcard), noFlashcardsElement);
+                });
+
+                if (data.has_next_flashcards_page) {
+                    loadMoreFlashcardsElement.dataset.nextFlashcardsCursor = data.next_flashcards_cursor;
+                    loadingFlashcards = false;
+
+                    // observing the element again checks if it is still in view (the page didn't fill the screen)
+                    flashcardsObserver.unobserve(loadMoreFlashcardsElement);
+                    flashcardsObserver.observe(loadMoreFlashcardsElement);
+                } else {
+                    flashcardsObserver.disconnect();
+                    loadMoreFlashcardsElement.remove();
+                }
+            })
+            .catch(() => {
+                // the page is requested again when the element is scrolled into view again
+                loadingFlashcards = false;
+            });
+    }
+
+    // the next page is loaded before the user reaches the end of the loaded flashcards
+    const flashcardsObserver = new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting))
+            loadNextFlashcardsPage();
+    }, { rootMargin: '400px' });
+
+    flashcardsObserver.observe(loadMoreFlashcardsElement);
+})();
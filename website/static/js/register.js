@@ -28,8 +28,22 @@ function sendVerificationCode() {
         },
         body: JSON.stringify({ username, email })
     })
-        .then(response => response.json())
-        .then(data =>
+        .then(response => response.json().then(data => ({ ok: response.ok, data })))
+        .then(({ ok, data }) => {
+            if (!ok) {
+                // rate limited or invalid request
+                Swal.fire({
+                    icon: "error",
+                    title: "Oops...",
+                    text: data.message,
+                    color: '#e4e0f3',
+                    background: '#110f16',
+                    showConfirmButton: false,
+                    timer: 2500,
+                });
+                return;
+            }
+
             Swal.fire({
                 icon: "success",
                 title: "Verification code was sent successfully!",
@@ -37,8 +51,8 @@ function sendVerificationCode() {
                 timer: 2200,
                 color: '#e4e0f3',
                 background: '#110f16'
-            })
-        )
+            });
+        })
         .catch(err =>
             Swal.fire({
                 icon: "error",
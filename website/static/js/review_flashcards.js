@@ -0,0 +1,103 @@
+const reviewMainScriptElement = document.getElementById('review-flashcards-page-main-script');
+
+// the flashcards due for review which weren't reviewed yet (the first one is the one shown)
+let dueFlashcards = JSON.parse(document.getElementById('due-flashcards').textContent);
+
+// the reviews which weren't saved yet (the next batch is requested after all of them are saved)
+let pendingReviews = [];
+
+function showDueFlashcard() {
+    const reviewSectionElement = document.getElementById('review-section');
+    const noDueFlashcardsElement = document.getElementById('no-due-flashcards');
+
+    if (dueFlashcards.length === 0) {
+        reviewSectionElement.style.setProperty('display', 'none', 'important');
+        noDueFlashcardsElement.style.display = 'block';
+        return;
+    }
+
+    const flashcard = dueFlashcards[0];
+    const reviewFlashcardElement = document.getElementById('reviewFlashcard');
+
+    reviewFlashcardElement.classList.remove('flipped');
+    document.getElementById('gradeButtons').style.visibility = 'hidden';
+
+    document.getElementById('reviewFlashcardFront').textContent = flashcard.front_side_text;
+    document.getElementById('reviewFlashcardBack').textContent = flashcard.back_side_text;
+
+    noDueFlashcardsElement.style.display = 'none';
+    reviewSectionElement.style.removeProperty('display');
+}
+
+function showAnswer() {
+    document.getElementById('reviewFlashcard').classList.toggle('flipped');
+    document.getElementById('gradeButtons').style.visibility = 'visible';
+}
+
+function loadDueFlashcards() {
+    const reviewFlashcardsUrl = reviewMainScriptElement.dataset.reviewFlashcardsUrl;
+
+    Promise.all(pendingReviews)
+        .then(() => fetch(reviewFlashcardsUrl, {
+            headers: {
+                'X-Requested-With': 'XMLHttpRequest'
+            }
+        }))
+        .then(response => response.json())
+        .then(data => {
+            pendingReviews = [];
+            dueFlashcards = data.flashcards;
+            showDueFlashcard();
+        });
+}
+
+function reviewFlashcard(grade) {
+    if (dueFlashcards.length === 0)
+        return;
+
+    const flashcard = dueFlashcards.shift();
+    const csrfToken = reviewMainScriptElement.dataset.csrfToken;
+    // the url from the script dataset is the url of the flashcard with id 0
+    const reviewFlashcardUrl = reviewMainScriptElement.dataset.reviewFlashcardUrl.replace(/0$/, flashcard.id);
+
+    const review = fetch(reviewFlashcardUrl, {
+        method: "POST",
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': csrfToken,
+            'X-Requested-With': 'XMLHttpRequest'
+        },
+        body: JSON.stringify({ grade })
+    })
+        .then(response => response.json())
+        .then(data => {
+            if (data.error) {
+                Swal.fire({
+                    title: "Oops...",
+                    text: data.error,
+                    icon: "error",
+                    color: '#e4e0f3',
+                    background: '#110f16'
+                });
+            }
+        })
+        .catch(() =>
+            Swal.fire({
+                title: "Oops...",
+                text: "There was an error saving the review of the flashcard!",
+                icon: "error",
+                color: '#e4e0f3',
+                background: '#110f16'
+            })
+        );
+
+    pendingReviews.push(review);
+
+    // the reviewed flashcards are rescheduled, so the next batch has just flashcards that weren't reviewed yet
+    if (dueFlashcards.length === 0)
+        loadDueFlashcards();
+    else
+        showDueFlashcard();
+}
+
+showDueFlashcard();
@@ -374,9 +374,9 @@ function initializePomodoroSession() {
     const loadMoreBtnElement = document.getElementById('loadMoreBtn');
     if (loadMoreBtnElement !== null) {
         loadMoreBtnElement.addEventListener('click', (event) => {
-            const nextMessagesPage = event.target.dataset.nextMessagesPage;
+            const nextMessagesCursor = event.target.dataset.nextMessagesCursor;
             const studySessionUrl = event.target.dataset.studySessionUrl;
-            const nextMessagesPageQueryUrl = studySessionUrl + "?messages-page=" + nextMessagesPage;
+            const nextMessagesPageQueryUrl = studySessionUrl + "?messages-cursor=" + encodeURIComponent(nextMessagesCursor);
 
 
             fetch(nextMessagesPageQueryUrl, {
@@ -402,7 +402,7 @@ function initializePomodoroSession() {
                     }
 
                     if (data.has_next_messages_page) {
-                        event.target.dataset.nextMessagesPage = data.next_messages_page;
+                        event.target.dataset.nextMessagesCursor = data.next_messages_cursor;
                     } else {
                         event.target.remove();
                     }
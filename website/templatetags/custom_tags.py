@@ -8,12 +8,17 @@ register = template.Library()
 def is_friend(session_user, user):
     """
     check if the user from the current session is friend with a given user
+    if the given user is annotated with his relation to the session user, the annotation is used instead of a query
 
     session_user: user from the current session
     user: a given user
 
     precondition: session_user and user are both valid users
     """
+    annotated_is_friend = getattr(user, 'is_friend', None)
+    if annotated_is_friend is not None:
+        return annotated_is_friend
+
     return check_friendship(session_user, user)
 
 
@@ -21,10 +26,21 @@ def is_friend(session_user, user):
 def pending_friend_request(user_1, user_2):
     """
     check if there is a friend request in pending sent by user_1 to user_2
+    if the other user is annotated with his relation to the session user, the annotation is used instead of a query
 
     session_user: user from the current session
     user: a given user
 
     precondition: session_user and user are both valid users
     """
+    # user_1 is the session user
+    annotated_pending_request = getattr(user_2, 'pending_request_received', None)
+    if annotated_pending_request is not None:
+        return annotated_pending_request
+
+    # user_2 is the session user
+    annotated_pending_request = getattr(user_1, 'pending_request_sent', None)
+    if annotated_pending_request is not None:
+        return annotated_pending_request
+
     return check_pending_friend_request(user_1, user_2)
@@ -0,0 +1,404 @@
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from unittest import mock
+from .models import FlashcardsFolder, Flashcard, StudySessionMessage
+from .redis_client import get_redis_client, get_async_redis_client
+from .search import search_documents, rebuild_search_index
+from .utils import *
+import asyncio
+import datetime
+import io
+import json
+import time
+
+# the redis clients fall back to the in-process fakeredis server when the default cache is not a redis cache
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'default'},
+    'sessions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'sessions'},
+}
+
+
+@override_settings(CACHES=TEST_CACHES, EMAIL_BACKEND='django.core.mail.backends.console.EmailBackend')
+class RedisTestCase(TestCase):
+    """
+    class responsible with running a test against an empty fakeredis server, the locmem caches and the console email backend
+    """
+
+    def setUp(self):
+        get_redis_client().flushall()
+
+
+class StudySessionTests(RedisTestCase):
+    """
+    class responsible with testing the study sessions kept in redis
+    """
+
+    async def test_register_reserves_an_unused_code(self):
+        await get_async_redis_client().set(get_study_session_code_key("takenCode"), "other")
+
+        with mock.patch('website.utils.generate_random_session_code', side_effect=["takenCode", "takenCode", "freeCode"]):
+            session_code = await aregister_study_session("alice")
+
+        self.assertEqual(session_code, "freeCode")
+        self.assertEqual(await aget_study_session_users("freeCode"), {"alice"})
+        self.assertEqual(await get_async_redis_client().get(get_study_session_code_key("takenCode")), b"other")
+
+    async def test_leave_twice(self):
+        session_code = await aregister_study_session("alice")
+        await aadd_user_to_study_session(session_code, "bob")
+
+        self.assertFalse(await aleave_study_session(session_code, "bob"))
+        self.assertFalse(await aleave_study_session(session_code, "bob"))
+        self.assertEqual(await aget_study_session_users(session_code), {"alice"})
+
+        self.assertTrue(await aleave_study_session(session_code, "alice"))
+        # the study session is already removed, so the second leave finds it empty again
+        self.assertTrue(await aleave_study_session(session_code, "alice"))
+        self.assertFalse(await avalid_study_session(session_code))
+
+    async def test_delete_empty_study_session(self):
+        session_code = await aregister_study_session("alice")
+        await apush_study_session_message(session_code, {
+            'create': timezone.now(), 'message_content': "hello", 'user_id': 1, 'user__username': "alice"})
+
+        self.assertTrue(await aleave_study_session(session_code, "alice"))
+
+        redis_client = get_async_redis_client()
+        self.assertFalse(await avalid_study_session(session_code))
+        self.assertEqual(await redis_client.exists(get_study_session_code_key(session_code),
+                                                   get_study_session_messages_key(session_code)), 0)
+        self.assertIsNone(await redis_client.zscore(STUDY_SESSIONS_ACTIVITY_KEY, session_code))
+        # a removed study session can't be joined again
+        self.assertFalse(await aadd_user_to_study_session(session_code, "bob"))
+        self.assertFalse(await avalid_study_session(session_code))
+
+    async def test_concurrent_join_and_leave(self):
+        for _ in range(20):
+            session_code = await aregister_study_session("alice")
+
+            joined, removed = await asyncio.gather(
+                aadd_user_to_study_session(session_code, "bob"),
+                aleave_study_session(session_code, "alice"))
+
+            # either bob joined before the last participant left, or the study session was removed before he joined
+            self.assertNotEqual(joined, removed)
+            self.assertEqual(await avalid_study_session(session_code), joined)
+            self.assertEqual(await aget_study_session_users(session_code), {"bob"} if joined else set())
+
+    async def test_concurrent_leaves_remove_the_study_session_once(self):
+        session_code = await aregister_study_session("alice")
+        await aadd_user_to_study_session(session_code, "bob")
+        await aadd_user_to_study_session(session_code, "carol")
+
+        removed = await asyncio.gather(*[aleave_study_session(session_code, username)
+                                         for username in ("alice", "bob", "carol")])
+
+        self.assertEqual(removed.count(True), 1)
+        self.assertFalse(await avalid_study_session(session_code))
+
+
+class RateLimitTests(RedisTestCase):
+    """
+    class responsible with testing the token buckets used for rate limiting
+    """
+
+    def test_bucket_empties_after_capacity_tokens(self):
+        bucket_key = get_rate_limit_key("test", "alice")
+
+        for _ in range(3):
+            self.assertEqual(consume_rate_limit_token([bucket_key], 3, 1 / 60), 0)
+
+        retry_after = consume_rate_limit_token([bucket_key], 3, 1 / 60)
+        self.assertGreater(retry_after, 55)
+        self.assertLessEqual(retry_after, 60)
+
+    def test_bucket_refills(self):
+        bucket_key = get_rate_limit_key("test", "alice")
+        self.assertEqual(consume_rate_limit_token([bucket_key], 1, 1), 0)
+
+        with mock.patch('website.utils.time.time', return_value=time.time() + 2):
+            self.assertEqual(consume_rate_limit_token([bucket_key], 1, 1), 0)
+
+    def test_empty_bucket_keeps_the_tokens_of_the_other_buckets(self):
+        user_bucket_key = get_rate_limit_key("test", "alice")
+        ip_bucket_key = get_rate_limit_key("test", "127.0.0.1")
+        self.assertEqual(consume_rate_limit_token([user_bucket_key], 1, 1 / 60), 0)
+
+        self.assertGreater(consume_rate_limit_token([user_bucket_key, ip_bucket_key], 1, 1 / 60), 0)
+        self.assertEqual(consume_rate_limit_token([ip_bucket_key], 1, 1 / 60), 0)
+
+
+class EmailOutboxTests(RedisTestCase):
+    """
+    class responsible with testing the outbox of the emails sent in background
+    """
+
+    @override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    def test_send_queued_emails(self):
+        enqueue_email("Verification code", "abc", "from@example.com", ["alice@example.com"])
+        enqueue_email("Verification code", "def", "from@example.com", ["bob@example.com"])
+
+        self.assertEqual(send_queued_emails(batch_size=10), (2, 0))
+        self.assertEqual([email.to for email in mail.outbox], [
+                         ["alice@example.com"], ["bob@example.com"]])
+        self.assertEqual(get_redis_client().llen(EMAILS_PROCESSING_KEY), 0)
+        self.assertEqual(send_queued_emails(batch_size=10), (0, 0))
+
+    def test_failed_email_is_retried(self):
+        enqueue_email("Verification code", "abc", "from@example.com", ["alice@example.com"])
+
+        with mock.patch('django.core.mail.backends.console.EmailBackend.send_messages', side_effect=OSError), \
+                self.assertLogs('website.utils', 'WARNING'):
+            self.assertEqual(send_queued_emails(), (0, 1))
+
+        redis_client = get_redis_client()
+        self.assertEqual(redis_client.llen(EMAILS_PROCESSING_KEY), 0)
+        self.assertEqual(redis_client.zcard(EMAILS_RETRY_KEY), 1)
+        # the next attempt isn't due yet
+        self.assertEqual(requeue_due_emails(), 0)
+
+        with mock.patch('website.utils.time.time', return_value=time.time() + 3600):
+            self.assertEqual(requeue_due_emails(), 1)
+        self.assertEqual(json.loads(redis_client.lindex(EMAILS_QUEUE_KEY, 0))['attempts'], 1)
+
+    def test_processing_emails_are_requeued(self):
+        enqueue_email("Verification code", "abc", "from@example.com", ["alice@example.com"])
+        redis_client = get_redis_client()
+        # a worker stopped after taking the email from the outbox
+        redis_client.lmove(EMAILS_QUEUE_KEY, EMAILS_PROCESSING_KEY, 'LEFT', 'RIGHT')
+
+        self.assertEqual(requeue_processing_emails(), 1)
+        self.assertEqual(redis_client.llen(EMAILS_QUEUE_KEY), 1)
+        # the console email backend writes the sent emails to the standard output
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            self.assertEqual(send_queued_emails(), (1, 0))
+        self.assertIn("To: alice@example.com", stdout.getvalue())
+
+    def test_invalid_email_is_dropped(self):
+        get_redis_client().rpush(EMAILS_QUEUE_KEY, "not json")
+
+        with self.assertLogs('website.utils', 'ERROR'):
+            self.assertEqual(send_queued_emails(), (0, 0))
+        self.assertEqual(get_redis_client().llen(EMAILS_PROCESSING_KEY), 0)
+
+
+class CursorTests(RedisTestCase):
+    """
+    class responsible with testing the keyset pagination of the chat history and of the folder flashcards
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username="alice")
+
+    def test_messages_cursor_round_trip(self):
+        create = timezone.now()
+        messages_cursor = encode_messages_cursor({'create': create, 'pk': 42})
+
+        self.assertEqual(decode_messages_cursor(messages_cursor), (create, 42))
+        with self.assertRaises(ValueError):
+            decode_messages_cursor("not a cursor")
+
+    def test_messages_pages(self):
+        create = timezone.now()
+        # the messages of a batch can have the same creation datetime, the id breaks the ties
+        StudySessionMessage.objects.bulk_create([StudySessionMessage(
+            user=self.user, group_name="study_session_code", message_content=str(message_index),
+            create=create - datetime.timedelta(seconds=message_index // 3)) for message_index in range(25)])
+
+        messages_contents = []
+        messages_cursor = None
+        while True:
+            messages, messages_cursor = get_study_session_messages_page(
+                "code", messages_cursor, 10)
+            messages_contents.extend(message['message_content'] for message in messages)
+            if messages_cursor is None:
+                break
+
+        self.assertEqual(sorted(messages_contents, key=int), [str(message_index) for message_index in range(25)])
+        self.assertEqual(len(messages_contents), 25)
+
+    def test_messages_first_page_from_redis(self):
+        create = timezone.now()
+        StudySessionMessage.objects.bulk_create([StudySessionMessage(
+            user=self.user, group_name="study_session_code", message_content=f"saved {message_index}",
+            create=create - datetime.timedelta(minutes=message_index + 1)) for message_index in range(5)])
+
+        async def push_recent_messages():
+            for message_index in range(3):
+                await apush_study_session_message("code", {
+                    'create': create + datetime.timedelta(seconds=message_index),
+                    'message_content': f"recent {message_index}", 'user_id': self.user.id, 'user__username': "alice"})
+
+        asyncio.run(push_recent_messages())
+
+        messages, messages_cursor = get_study_session_messages_page("code", None, 4)
+        self.assertEqual([message['message_content'] for message in messages],
+                         ["recent 2", "recent 1", "recent 0", "saved 0"])
+
+        messages, messages_cursor = get_study_session_messages_page("code", messages_cursor, 4)
+        self.assertEqual([message['message_content'] for message in messages],
+                         ["saved 1", "saved 2", "saved 3", "saved 4"])
+        self.assertIsNone(messages_cursor)
+
+    def test_folder_flashcards_pages(self):
+        folder = FlashcardsFolder.objects.create(user=self.user, name="folder")
+        flashcards = Flashcard.objects.bulk_create([Flashcard(
+            user=self.user, folder=folder, front_side_text=f"front {flashcard_index}", back_side_text="back")
+            for flashcard_index in range(9)])
+
+        flashcards_ids = []
+        flashcards_cursor = None
+        while True:
+            page, flashcards_cursor = get_folder_flashcards_page(folder.pk, flashcards_cursor, 4)
+            flashcards_ids.extend(flashcard['id'] for flashcard in page)
+            if flashcards_cursor is None:
+                break
+
+        self.assertEqual(flashcards_ids, [flashcard.pk for flashcard in flashcards])
+        with self.assertRaises(ValueError):
+            get_folder_flashcards_page(folder.pk, "not a cursor", 4)
+
+
+class FlashcardsImportTests(RedisTestCase):
+    """
+    class responsible with testing the parsing and the import of the flashcards files
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username="alice")
+        self.folder = FlashcardsFolder.objects.create(user=self.user, name="folder")
+
+    def import_file(self, name: str, content: str) -> tuple:
+        flashcards_file = SimpleUploadedFile(name, content.encode())
+        return import_flashcards(self.user, self.folder, read_flashcards_file(
+            flashcards_file, get_flashcards_file_format(flashcards_file)))
+
+    def test_csv_import_with_bad_rows(self):
+        imported_flashcards_number, invalid_rows_numbers = self.import_file(
+            "deck.CSV", "front,back\nq1,a1\nonly front\n\n ,a3\nq4,a4,tags\n")
+
+        self.assertEqual(imported_flashcards_number, 2)
+        self.assertEqual(invalid_rows_numbers, [3, 5])
+        self.folder.refresh_from_db()
+        self.assertEqual(self.folder.flashcards_number, 2)
+        self.assertEqual(list(Flashcard.objects.filter(folder=self.folder).order_by('pk').values_list(
+            'front_side_text', 'back_side_text')), [("q1", "a1"), ("q4", "a4")])
+
+    def test_json_import_with_bad_rows(self):
+        imported_flashcards_number, invalid_rows_numbers = self.import_file("deck.json", """[
+            {"front": "q1", "back": "a1"}, 12345, ["q3", "a3"], {"front": "q4"},
+            {"front_side_text": "q5", "back_side_text": "a5"}, null, "text"
+        ]""")
+
+        self.assertEqual(imported_flashcards_number, 3)
+        self.assertEqual(invalid_rows_numbers, [2, 4, 6, 7])
+
+    def test_invalid_json_file(self):
+        with self.assertRaises(ValueError):
+            self.import_file("deck.json", '{"front": "q1", "back": "a1"}')
+        with self.assertRaises(ValueError):
+            self.import_file("deck.json", '[{"front": "q1", "back": "a1"} {"front": "q2", "back": "a2"}]')
+
+    def test_json_items_split_between_chunks(self):
+        text = '[12345, {"front": "q1", "back": "a1"}, 1.5e10 , true,["q2","a2"], 7]'
+
+        for chunk_size in range(1, 12):
+            with mock.patch('website.utils.FLASHCARDS_FILE_CHUNK_SIZE', chunk_size):
+                self.assertEqual(list(read_json_array_items(io.StringIO(text))), [
+                                 12345, {"front": "q1", "back": "a1"}, 1.5e10, True, ["q2", "a2"], 7])
+
+    def test_json_item_too_large(self):
+        with mock.patch('website.utils.FLASHCARDS_FILE_CHUNK_SIZE', 4):
+            with self.assertRaises(ValueError):
+                list(read_json_array_items(io.StringIO('[{"front": "' + "x" * 100 + '"}]'), max_item_size=16))
+
+
+class FlashcardReviewTests(TestCase):
+    """
+    class responsible with testing the scheduling of the flashcards reviews (SM-2)
+    """
+
+    def test_first_reviews(self):
+        flashcard = Flashcard()
+        reviewed_at = timezone.now()
+
+        schedule_flashcard_review(flashcard, 4, reviewed_at)
+        self.assertEqual((flashcard.repetitions, flashcard.interval), (1, 1))
+        schedule_flashcard_review(flashcard, 4, reviewed_at)
+        self.assertEqual((flashcard.repetitions, flashcard.interval), (2, 6))
+        self.assertEqual(flashcard.due_at, reviewed_at + datetime.timedelta(days=6))
+
+    def test_forgotten_flashcard(self):
+        flashcard = Flashcard(repetitions=5, interval=100, ease_factor=1.35)
+
+        schedule_flashcard_review(flashcard, 0, timezone.now())
+
+        self.assertEqual((flashcard.repetitions, flashcard.interval), (0, 1))
+        self.assertEqual(flashcard.ease_factor, MINIMUM_EASE_FACTOR)
+
+    def test_interval_cap(self):
+        flashcard = Flashcard(repetitions=10, interval=30000, ease_factor=2.5)
+        reviewed_at = timezone.now()
+
+        schedule_flashcard_review(flashcard, 5, reviewed_at)
+
+        self.assertEqual(flashcard.interval, MAXIMUM_REVIEW_INTERVAL)
+        self.assertEqual(flashcard.due_at, reviewed_at +
+                         datetime.timedelta(days=MAXIMUM_REVIEW_INTERVAL))
+        schedule_flashcard_review(flashcard, 5, reviewed_at)
+        self.assertEqual(flashcard.interval, MAXIMUM_REVIEW_INTERVAL)
+
+
+class SearchTests(TestCase):
+    """
+    class responsible with testing the search of the flashcards and the tasks (the inverted index on non-MySQL databases)
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username="alice")
+        self.folder = FlashcardsFolder.objects.create(user=self.user, name="biology")
+
+    def test_search_ranks_by_matched_terms(self):
+        both_terms = Flashcard.objects.create(user=self.user, folder=self.folder,
+                                              front_side_text="photosynthesis", back_side_text="chlorophyll light")
+        one_term = Flashcard.objects.create(user=self.user, folder=self.folder,
+                                            front_side_text="chlorophyll", back_side_text="green pigment")
+        other_user = User.objects.create(username="bob")
+        Flashcard.objects.create(user=other_user, folder=FlashcardsFolder.objects.create(user=other_user, name="biology"),
+                                 front_side_text="chlorophyll", back_side_text="photosynthesis")
+
+        hits, has_next_page = search_documents(self.user.pk, "Chlorophyll photosynthesis", 1, 20)
+
+        self.assertEqual([hit['id'] for hit in hits], [both_terms.pk, one_term.pk])
+        self.assertFalse(has_next_page)
+
+    def test_search_index_follows_the_updates(self):
+        flashcard = Flashcard.objects.create(user=self.user, folder=self.folder,
+                                             front_side_text="mitochondria", back_side_text="powerhouse")
+
+        flashcard.front_side_text = "ribosome"
+        flashcard.save()
+        self.assertEqual(search_documents(self.user.pk, "mitochondria", 1, 20), ([], False))
+        self.assertEqual(len(search_documents(self.user.pk, "ribosome", 1, 20)[0]), 1)
+
+        flashcard.delete()
+        self.assertEqual(search_documents(self.user.pk, "ribosome", 1, 20), ([], False))
+
+    def test_search_pages(self):
+        Flashcard.objects.bulk_create([Flashcard(user=self.user, folder=self.folder,
+                                                 front_side_text="enzyme", back_side_text=str(flashcard_index))
+                                       for flashcard_index in range(5)])
+        rebuild_search_index()
+
+        first_page, has_next_page = search_documents(self.user.pk, "enzyme", 1, 3)
+        second_page, has_last_page_next = search_documents(self.user.pk, "enzyme", 2, 3)
+
+        self.assertEqual((len(first_page), has_next_page), (3, True))
+        self.assertEqual((len(second_page), has_last_page_next), (2, False))
+        self.assertFalse({hit['id'] for hit in first_page} & {hit['id'] for hit in second_page})
+        self.assertEqual(search_documents(self.user.pk, "an", 1, 3), ([], False))
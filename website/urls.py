@@ -39,10 +39,21 @@ urlpatterns = [
     path('main/flashcards/create-flashcard',
          views.flashcard_create, name='create_flashcard'),
     path('main/flashcards/folder/<str:folder_name>', views.folder, name='folder'),
+    path('main/flashcards/review-flashcards',
+         views.flashcards_review, name='review_flashcards'),
+    path('main/flashcards/folder/<str:folder_name>/review-flashcards',
+         views.flashcards_review, name='review_folder_flashcards'),
+    path('main/flashcards/review-flashcard/flashcard/<int:pk>',
+         views.flashcard_review, name='review_flashcard'),
+    path('main/flashcards/folder/<str:folder_name>/import-flashcards',
+         views.flashcards_import, name='import_flashcards'),
+    path('main/flashcards/folder/<str:folder_name>/export-flashcards',
+         views.flashcards_export, name='export_flashcards'),
     path('main/flashcards/update-flashcard/flashcard/<int:pk>',
          views.flashcard_update, name='update_flashcard'),
     path('main/flashcards/delete-flashcard/flashcard/<int:pk>',
          views.flashcard_delete, name='delete_flashcard'),
     path('main/flashcards/delete-folder/folder/<int:pk>',
-         views.folder_delete, name='delete_folder')
+         views.folder_delete, name='delete_folder'),
+    path('main/search/', views.search, name='search')
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -1,35 +1,43 @@
 from django.core.cache import cache
+from django.conf import settings
 from django.utils import timezone
-from .models import Task, StudySessionMessage, FriendRequest, Friendship, FlashcardsFolder
+from .models import Task, StudySessionMessage, FriendRequest, Friendship, FlashcardsFolder, Flashcard, UserProfile
+from .serializers import DEFAULT_PROFILE_PICTURE_URL
+from .middleware import get_user_timezone_name
+from .redis_client import get_redis_client, get_async_redis_client
+from .search import fulltext_search_supported, index_documents
 from django.db.models.query import QuerySet
+from django.db.models import Count, Q, F, Exists, OuterRef
+from django.db.models.functions import TruncDate
 from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
 import string
-import random
+import datetime
+import io
+import csv
+import time
+import secrets
 import json
-import pickle
+from zoneinfo import ZoneInfo
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# all characters that can be used in the verification code
+VERIFICATION_CODE_CHARACTERS = string.ascii_lowercase + \
+    string.ascii_uppercase + string.digits + string.punctuation
 
 
 def generate_verification_code():
     """
     helper function that generates a verification code for the mail verification process
+    the characters are chosen with the secrets module (a cryptographically secure source of randomness)
     """
-    letters = string.ascii_lowercase + string.ascii_uppercase
-    digits = string.digits
-    special_characters = string.punctuation
-
-    # creating a list with all characters that can be used in the verification code
-    available_characters = list(letters + digits + special_characters)
-
-    # shuffle the list with all characters for more randomness
-    random.shuffle(available_characters)
 
     # the verification code will have 8 characters
-    code = ""
-    for _ in range(8):
-        random_index = random.randint(0, len(available_characters) - 1)
-        code += available_characters[random_index]
-
-    return code
+    return ''.join(secrets.choice(VERIFICATION_CODE_CHARACTERS) for _ in range(8))
 
 
 def save_verification_code(record_key: string, record_value: string):
@@ -41,6 +49,27 @@ def save_verification_code(record_key: string, record_value: string):
     cache.set(record_key, record_value, timeout=180)
 
 
+def get_or_create_verification_code(record_key: string) -> string:
+    """
+    helper function that returns the outstanding verification code saved with a given key
+    a new verification code is generated and saved only if there is no outstanding one
+    """
+    verification_code = generate_verification_code()
+
+    # the verification code will be available for just 3 minutes (180 seconds) after the first request
+    # (cache.add is an atomic SET NX, so concurrent requests can't issue different codes)
+    if cache.add(record_key, verification_code, timeout=180):
+        return verification_code
+
+    outstanding_verification_code = cache.get(record_key)
+    if outstanding_verification_code is None:
+        # the outstanding verification code expired in the meantime
+        save_verification_code(record_key, verification_code)
+        return verification_code
+
+    return outstanding_verification_code
+
+
 def check_verification_code(verification_code: string, expected_verification_code_key: string) -> bool:
     """
     helper function that checks if the verification code entered by the user is the expected verification code
@@ -66,92 +95,707 @@ def delete_verification_code(record_key: string):
         return
 
 
-def filter_tasks_by_deadline_date(tasks: QuerySet, deadline_date: string):
+def get_rate_limit_key(scope: string, identifier: string) -> string:
+    """
+    helper function that returns the redis key of a token bucket used for rate limiting
+    """
+    return f"rate_limit:{scope}:{identifier}"
+
+
+def consume_rate_limit_token(bucket_keys: list, capacity: int, refill_rate: float) -> float:
+    """
+    helper function that takes a token from every token bucket given (a request is allowed only if all buckets have tokens)
+    every bucket holds at most capacity tokens and gains refill_rate tokens per second
+    returns 0 if the tokens were taken, otherwise the number of seconds until the buckets will have tokens again
+    """
+    redis_client = get_redis_client()
+
+    # the empty buckets are refilled after capacity / refill_rate seconds, so they can expire then
+    bucket_timeout = max(1, int(capacity / refill_rate) + 1)
+
+    def take_token(pipeline) -> float:
+        now = time.time()
+
+        buckets_tokens = []
+        for bucket_key in bucket_keys:
+            tokens, last_refill_time = pipeline.hmget(
+                bucket_key, 'tokens', 'time')
+
+            if tokens is None:
+                buckets_tokens.append(capacity)
+            else:
+                buckets_tokens.append(min(capacity, float(tokens) +
+                                          (now - float(last_refill_time)) * refill_rate))
+
+        retry_after = max((1 - tokens) / refill_rate
+                          for tokens in buckets_tokens)
+
+        pipeline.multi()
+        if retry_after > 0:
+            return retry_after
+
+        for bucket_key, tokens in zip(bucket_keys, buckets_tokens):
+            pipeline.hset(bucket_key, mapping={
+                          'tokens': tokens - 1, 'time': now})
+            pipeline.expire(bucket_key, bucket_timeout)
+
+        return 0
+
+    # the buckets are watched, so the transaction is retried if a concurrent request took a token in the meantime
+    return redis_client.transaction(take_token, *bucket_keys, value_from_callable=True)
+
+
+# redis list with the emails waiting to be sent (the outbox)
+EMAILS_QUEUE_KEY = "emails:queue"
+
+# redis sorted set with the emails which failed to be sent, scored by the time of the next sending attempt
+EMAILS_RETRY_KEY = "emails:retry"
+
+# redis list with the emails taken from the outbox by the worker and not handled yet (sent, scheduled for retry or dropped)
+EMAILS_PROCESSING_KEY = "emails:processing"
+
+
+def enqueue_email(subject: string, message: string, from_email: string, recipient_list: list):
+    """
+    helper function that adds an email in the outbox, without sending it
+    the emails from the outbox are sent in background by the send_queued_emails management command
+    """
+    get_redis_client().rpush(EMAILS_QUEUE_KEY, json.dumps({
+        'subject': subject,
+        'message': message,
+        'from_email': from_email,
+        'recipient_list': recipient_list,
+        'attempts': 0,
+    }))
+
+
+def requeue_due_emails() -> int:
+    """
+    helper function that moves back in the outbox the failed emails whose next sending attempt is due
+    returns the number of emails moved
+    """
+    redis_client = get_redis_client()
+    requeued_emails_number = 0
+
+    for email in redis_client.zrangebyscore(EMAILS_RETRY_KEY, '-inf', time.time()):
+        # only the worker which removes the email from the retry set puts it back in the outbox
+        if redis_client.zrem(EMAILS_RETRY_KEY, email):
+            redis_client.rpush(EMAILS_QUEUE_KEY, email)
+            requeued_emails_number += 1
+
+    return requeued_emails_number
+
+
+def requeue_processing_emails() -> int:
+    """
+    helper function that moves back in the outbox the emails left in processing by a worker that stopped before handling them
+    (they may be sent twice, but they are never lost)
+    returns the number of emails moved
+    """
+    redis_client = get_redis_client()
+    requeued_emails_number = 0
+
+    while redis_client.lmove(EMAILS_PROCESSING_KEY, EMAILS_QUEUE_KEY, 'RIGHT', 'LEFT') is not None:
+        requeued_emails_number += 1
+
+    return requeued_emails_number
+
+
+def send_queued_emails(batch_size: int = 50, wait_timeout: float = 0) -> tuple:
+    """
+    helper function that sends a batch of emails from the outbox through a single connection of the email backend
+    waits at most wait_timeout seconds for an email if the outbox is empty
+    the emails are moved from the outbox to the processing list and removed from it only after they are handled,
+    so the emails of a worker that crashed in the middle of a batch are sent again (requeue_processing_emails)
+    a failed email is retried after EMAIL_QUEUE_RETRY_DELAY * 2 ** (attempts - 1) seconds, at most EMAIL_QUEUE_MAX_ATTEMPTS times
+    returns the number of emails sent and the number of emails failed
+    """
+    redis_client = get_redis_client()
+
+    emails = []
+    if wait_timeout:
+        first_email = redis_client.blmove(
+            EMAILS_QUEUE_KEY, EMAILS_PROCESSING_KEY, wait_timeout, 'LEFT', 'RIGHT')
+        if first_email is None:
+            return 0, 0
+
+        emails.append(first_email)
+        batch_size -= 1
+
+    if batch_size > 0:
+        pipeline = redis_client.pipeline(transaction=False)
+        for _ in range(batch_size):
+            pipeline.lmove(EMAILS_QUEUE_KEY, EMAILS_PROCESSING_KEY, 'LEFT', 'RIGHT')
+        emails.extend(email for email in pipeline.execute() if email is not None)
+
+    if not emails:
+        return 0, 0
+
+    sent_emails_number = 0
+    failed_emails_number = 0
+
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception:
+        # the emails are retried if the connection to the email service can't be opened
+        logger.exception("Opening the email backend connection failed")
+
+    for encoded_email in emails:
+        try:
+            email = json.loads(encoded_email)
+            email_message = EmailMessage(email['subject'], email['message'],
+                                         email['from_email'], email['recipient_list'])
+        except (ValueError, KeyError, TypeError):
+            # an invalid email would fail at every attempt, so it is dropped
+            logger.exception("Dropped the invalid queued email %r", encoded_email)
+            redis_client.lrem(EMAILS_PROCESSING_KEY, 1, encoded_email)
+            continue
+
+        try:
+            connection.send_messages([email_message])
+            sent_emails_number += 1
+            redis_client.lrem(EMAILS_PROCESSING_KEY, 1, encoded_email)
+        except Exception:
+            failed_emails_number += 1
+            email['attempts'] = email.get('attempts', 0) + 1
+
+            if email['attempts'] >= settings.EMAIL_QUEUE_MAX_ATTEMPTS:
+                logger.exception("Dropped the email for %s after %s attempts",
+                                 email['recipient_list'], email['attempts'])
+                redis_client.lrem(EMAILS_PROCESSING_KEY, 1, encoded_email)
+                continue
+
+            logger.warning("Sending the email for %s failed (attempt %s)",
+                           email['recipient_list'], email['attempts'], exc_info=True)
+            next_attempt_time = time.time() + settings.EMAIL_QUEUE_RETRY_DELAY * \
+                2 ** (email['attempts'] - 1)
+
+            # the email is moved from the processing list to the retry set atomically
+            pipeline = redis_client.pipeline(transaction=True)
+            pipeline.zadd(EMAILS_RETRY_KEY, {
+                          json.dumps(email): next_attempt_time})
+            pipeline.lrem(EMAILS_PROCESSING_KEY, 1, encoded_email)
+            pipeline.execute()
+
+    try:
+        connection.close()
+    except Exception:
+        logger.exception("Closing the email backend connection failed")
+
+    return sent_emails_number, failed_emails_number
+
+
+def get_deadline_date_range(deadline_date: string, range_mode: string = "day"):
+    """
+    helper function that computes the interval [start, end) of aware datetimes that covers the local calendar
+    day, week or month of a given deadline date (format: YYYY-MM-DD)
+    the interval is computed in the active timezone, so the bounds can be compared directly with the stored deadlines
+    raises ValueError if the deadline date or the range mode are not valid
+    """
+    date = datetime.date.fromisoformat(deadline_date)
+
+    if range_mode == "day":
+        start_date = date
+        end_date = start_date + datetime.timedelta(days=1)
+    elif range_mode == "week":
+        # the week starts on Monday
+        start_date = date - datetime.timedelta(days=date.weekday())
+        end_date = start_date + datetime.timedelta(days=7)
+    elif range_mode == "month":
+        start_date = date.replace(day=1)
+        end_date = (start_date + datetime.timedelta(days=32)).replace(day=1)
+    else:
+        raise ValueError(f"Invalid deadline range mode: {range_mode}")
+
+    start = timezone.make_aware(
+        datetime.datetime.combine(start_date, datetime.time.min))
+    end = timezone.make_aware(
+        datetime.datetime.combine(end_date, datetime.time.min))
+
+    return start, end
+
+
+def filter_tasks_by_deadline_date(tasks: QuerySet, deadline_date: string, range_mode: string = "day") -> QuerySet:
     """
     helper function that filters the tasks received as parameter by a given deadline date
+    the filtering is done by the database with a range query on the deadline field, so the result can be paginated directly in SQL
+
+    range_mode: "day", "week" or "month" (the local calendar interval that contains the deadline date)
+    """
+    try:
+        start, end = get_deadline_date_range(deadline_date, range_mode)
+    except ValueError:
+        return tasks.none()
+
+    return tasks.filter(deadline__gte=start, deadline__lt=end)
+
+
+def get_deadlines_frequency_key(user_id: int) -> string:
+    """
+    helper function that returns the cache key under which the deadlines frequency of a user is stored
+    """
+    return f"deadlines_frequency:{user_id}"
+
+
+def get_deadline_dates(user_id: int, tzname: string) -> QuerySet:
+    """
+    helper function that returns the query which groups the uncompleted tasks of a user by the local date of their deadline
+    """
+    return Task.objects.filter(
+        user_id=user_id, is_complete=False, deadline__isnull=False
+    ).annotate(
+        deadline_date=TruncDate('deadline', tzinfo=ZoneInfo(tzname))
+    ).values('deadline_date').annotate(
+        tasks_number=Count('id')
+    ).order_by()
+
+
+def get_deadlines_frequency(user: User) -> dict:
+    """
+    helper function that returns the number of uncompleted tasks with a deadline for every local calendar day of a user
+    the keys have the format "year-month-day", with the month adjusted to the 0-indexed version of Javascript
+
+    the tasks are grouped by the database (the deadlines are truncated to dates in the timezone of the user country)
+    and the result is stored in cache memory until a task of the user is created, updated or deleted
+    """
+    tzname = get_user_timezone_name(user)
+    record_key = get_deadlines_frequency_key(user.id)
+
+    # the cached result is valid only for the timezone it was computed in (the user can change his country)
+    record = cache.get(record_key)
+    if record is not None and record['tzname'] == tzname:
+        return record['deadlines']
+
+    deadline_dates = get_deadline_dates(user.id, tzname)
+
+    deadlines = {}
+    for deadline_date in deadline_dates:
+        date = deadline_date['deadline_date']
+        deadlines[f"{date.year}-{date.month - 1}-{date.day}"] = deadline_date['tasks_number']
+
+    cache.set(record_key, {'tzname': tzname,
+              'deadlines': deadlines}, timeout=None)
+
+    return deadlines
+
+
+def delete_deadlines_frequency(user_id: int):
     """
-    filtered_tasks_pks = []
+    helper function that deletes from cache memory the deadlines frequency of a user
+    this function is intended to be called every time a task of the user is modified
+    """
+    cache.delete(get_deadlines_frequency_key(user_id))
+
 
-    for task in tasks:
-        if task.deadline:
-            deadline_field = str(timezone.localtime(task.deadline))
-            if deadline_date in deadline_field:
-                filtered_tasks_pks.append(task.pk)
+# redis sorted set with the time of the last activity of every study session
+STUDY_SESSIONS_ACTIVITY_KEY = "study_sessions:activity"
 
-    return tasks.filter(pk__in=filtered_tasks_pks)
+# number of the most recent messages of every study session kept in redis
+STUDY_SESSION_RECENT_MESSAGES_NUMBER = 200
 
 
-def valid_study_session(session_code: string) -> bool:
+def get_study_session_key(session_code: string) -> string:
+    """
+    helper function that returns the redis key of the set with the usernames of a study session participants
+    """
+    return f"study_session:{session_code}"
+
+
+def get_study_session_code_key(session_code: string) -> string:
+    """
+    helper function that returns the redis key reserving a study session code (it lives as long as the study session)
+    """
+    return f"study_session_code:{session_code}"
+
+
+def get_study_session_messages_key(session_code: string) -> string:
+    """
+    helper function that returns the redis key of the list with the most recent messages of a study session
+    """
+    return f"study_session_messages:{session_code}"
+
+
+def get_study_session_group_key(session_code: string) -> string:
+    """
+    helper function that returns the redis key under which the channel layer stores the group of a study session
+    """
+    return f"asgi:group:study_session_{session_code}"
+
+
+def add_touch_study_session_commands(pipeline, session_code: string):
+    """
+    helper function that adds to a redis pipeline the commands marking a study session as active at the current time
+    """
+    pipeline.expire(get_study_session_key(session_code),
+                    settings.STUDY_SESSION_IDLE_TIMEOUT)
+    pipeline.expire(get_study_session_code_key(session_code),
+                    settings.STUDY_SESSION_IDLE_TIMEOUT)
+    pipeline.expire(get_study_session_messages_key(session_code),
+                    settings.STUDY_SESSION_IDLE_TIMEOUT)
+    pipeline.zadd(STUDY_SESSIONS_ACTIVITY_KEY, {session_code: time.time()})
+
+
+async def atouch_study_session(session_code: string):
+    """
+    helper function that marks a study session as active at the current time
+    the study session expires (redis deletes it) if it isn't touched again in the next STUDY_SESSION_IDLE_TIMEOUT seconds
+    """
+    redis_client = get_async_redis_client()
+
+    pipeline = redis_client.pipeline(transaction=False)
+    add_touch_study_session_commands(pipeline, session_code)
+    await pipeline.execute()
+
+
+def reap_idle_study_sessions(batch_size: int = 100) -> int:
+    """
+    helper function that removes the study sessions that have been idle for more than STUDY_SESSION_IDLE_TIMEOUT seconds
+    the group of the channel layer and the chat history of every expired study session are deleted in batches
+    returns the number of study sessions removed
+    """
+    redis_client = get_redis_client()
+    idle_since = time.time() - settings.STUDY_SESSION_IDLE_TIMEOUT
+    removed_sessions_number = 0
+
+    while True:
+        session_codes = [session_code.decode() for session_code in redis_client.zrangebyscore(
+            STUDY_SESSIONS_ACTIVITY_KEY, '-inf', idle_since, start=0, num=batch_size)]
+        if not session_codes:
+            return removed_sessions_number
+
+        pipeline = redis_client.pipeline(transaction=False)
+        for session_code in session_codes:
+            pipeline.exists(get_study_session_key(session_code))
+        sessions_exist = pipeline.execute()
+
+        expired_session_codes = []
+        active_session_codes = []
+        for session_code, exists in zip(session_codes, sessions_exist):
+            if exists:
+                active_session_codes.append(session_code)
+            else:
+                expired_session_codes.append(session_code)
+
+        if expired_session_codes:
+            redis_client.delete(*[get_study_session_group_key(session_code)
+                                for session_code in expired_session_codes],
+                                *[get_study_session_messages_key(session_code)
+                                for session_code in expired_session_codes],
+                                *[get_study_session_code_key(session_code)
+                                for session_code in expired_session_codes])
+            StudySessionMessage.objects.filter(group_name__in=[
+                f"study_session_{session_code}" for session_code in expired_session_codes]).delete()
+            redis_client.zrem(STUDY_SESSIONS_ACTIVITY_KEY,
+                              *expired_session_codes)
+
+        if active_session_codes:
+            # the study session key hasn't expired yet, it will be checked again at the next reaping
+            redis_client.zadd(STUDY_SESSIONS_ACTIVITY_KEY, {
+                session_code: time.time() for session_code in active_session_codes})
+
+        removed_sessions_number += len(expired_session_codes)
+
+
+async def avalid_study_session(session_code: string) -> bool:
     """
     helper function that checks if the given session code corresponds to a valid study session
     returns True if there is a valid study session with the given code or False otherwise
     """
+    redis_client = get_async_redis_client()
+
+    # redis deletes the empty sets, so a study session exists as long as it has at least one participant
+    return await redis_client.exists(get_study_session_key(session_code)) == 1
+
+
+# characters of the study session codes (12 letters, so there are 52 ** 12 codes)
+STUDY_SESSION_CODE_CHARACTERS = string.ascii_lowercase + string.ascii_uppercase
+
 
-    return cache.get(session_code) is not None
+def generate_random_session_code() -> string:
+    """
+    helper function that generates a random study session code, with the secrets module
+    """
+    return ''.join(secrets.choice(STUDY_SESSION_CODE_CHARACTERS) for _ in range(12))
 
 
-def register_study_session(session_code: string, username: string):
+async def aregister_study_session(username: string) -> string:
     """
-    helper function that registers in cache memory a study session
+    helper function that registers in redis a study session with a new unique code and returns the code
+    the code is reserved with an atomic SET NX, so two concurrent creators never get the same code
+    (a taken code is practically never generated, so the reservation takes a single round-trip)
 
     username: the username of the user that created the study session
     """
-    cache.set(session_code, [username], timeout=None)
+    redis_client = get_async_redis_client()
+
+    session_code = generate_random_session_code()
+    while not await redis_client.set(get_study_session_code_key(session_code), username,
+                                     nx=True, ex=settings.STUDY_SESSION_IDLE_TIMEOUT):
+        session_code = generate_random_session_code()
 
+    await aadd_user_to_study_session(session_code, username)
 
-def add_user_to_study_session(session_code: string, username: string):
+    return session_code
+
+
+async def aadd_user_to_study_session(session_code: string, username: string) -> bool:
     """
     helper function that adds a user to a study session
-
-    precondition: the given session code corresponds to a valid study session
+    the user is added only while the study session code is reserved, in a transaction watching the reservation,
+    so a study session removed in the meantime (by its last participant or by the reaper) is never recreated
+    returns True if the user was added or False if the study session doesn't exist anymore
     """
-    users = cache.get(session_code, [])
+    redis_client = get_async_redis_client()
+    study_session_code_key = get_study_session_code_key(session_code)
+
+    async def add_participant(pipeline) -> bool:
+        study_session_exists = await pipeline.exists(study_session_code_key)
+
+        pipeline.multi()
+        if not study_session_exists:
+            return False
 
-    if username not in users:
-        users.append(username)
-        cache.set(session_code, users, timeout=None)
+        pipeline.sadd(get_study_session_key(session_code), username)
+        add_touch_study_session_commands(pipeline, session_code)
 
+        return True
 
-def remove_user_from_study_session(session_code: string, username: string):
+    # the transaction is retried if the study session was removed while the user was being added
+    return await redis_client.transaction(add_participant, study_session_code_key, value_from_callable=True)
+
+
+async def aleave_study_session(session_code: string, username: string) -> bool:
     """
-    helper function that removes a user from a study session
+    helper function that removes a user from a study session and removes the study session if it remains empty
+    the check of the remaining participants and the removal are executed atomically, in a transaction watching the
+    participants set, so a user joining in the meantime is never removed together with the study session
+    returns True if the study session was removed or False otherwise
 
     precondition: the given session code corresponds to a valid study session
     """
-    users = cache.get(session_code, [])
+    redis_client = get_async_redis_client()
+    study_session_key = get_study_session_key(session_code)
+
+    async def remove_participant(pipeline) -> bool:
+        other_participants_number = await pipeline.scard(
+            study_session_key) - await pipeline.sismember(study_session_key, username)
 
-    users.remove(username)
-    cache.set(session_code, users, timeout=None)
+        pipeline.multi()
+        if other_participants_number > 0:
+            pipeline.srem(study_session_key, username)
+            return False
 
+        add_remove_study_session_commands(pipeline, session_code)
+        return True
 
-def study_session_empty(session_code: string) -> bool:
+    # the transaction is retried if a user joined or left the study session in the meantime
+    study_session_removed = await redis_client.transaction(
+        remove_participant, study_session_key, value_from_callable=True)
+
+    # the code reservation is already deleted, so nobody can join the study session while its history is deleted
+    if study_session_removed:
+        await adelete_study_session_chat_history(session_code)
+
+    return study_session_removed
+
+
+async def aget_study_session_users(session_code: string) -> set:
     """
-    helper function that checks if a study session is empty (if there are no users in session)
+    helper function that returns the set with the usernames of a study session participants
     """
-    users = cache.get(session_code, [])
+    redis_client = get_async_redis_client()
 
-    return len(users) == 0
+    return {username.decode() for username in await redis_client.smembers(get_study_session_key(session_code))}
 
 
-def delete_study_session_chat_history(session_code: string):
+async def adelete_study_session_chat_history(session_code: string):
     """
     helper function that deletes all messages saved for a study session chat
     """
-    StudySessionMessage.objects.filter(
-        group_name=f"study_session_{session_code}").delete()
+    await StudySessionMessage.objects.filter(
+        group_name=f"study_session_{session_code}").adelete()
 
 
-def remove_study_session(session_code: string):
+def encode_messages_cursor(message: dict) -> string:
     """
-    helper function that removes a study session
+    helper function that encodes the position of a study session message in the chat history as a cursor
 
-    precondition: the given session code corresponds to a valid study session
+    message: the values (create and pk) of a study session message
+    """
+    return f"{message['create'].isoformat()}_{message['pk']}"
+
+
+def decode_messages_cursor(messages_cursor: string) -> tuple:
+    """
+    helper function that decodes a cursor into the creation datetime and the id of a study session message
+    raises ValueError if the cursor is not valid
+    """
+    create, pk = messages_cursor.rsplit("_", 1)
+
+    return datetime.datetime.fromisoformat(create), int(pk)
+
+
+async def apush_study_session_message(session_code: string, message: dict):
+    """
+    helper function that adds a message to the list with the most recent messages of a study session
+    the list is capped, just the newest STUDY_SESSION_RECENT_MESSAGES_NUMBER messages are kept
+
+    message: the values of the message (create, message_content, user_id, user__username)
+    """
+    redis_client = get_async_redis_client()
+
+    pipeline = redis_client.pipeline(transaction=True)
+    add_push_study_session_message_commands(pipeline, session_code, message)
+    await pipeline.execute()
+
+
+def add_push_study_session_message_commands(pipeline, session_code: string, message: dict):
+    """
+    helper function that adds to a redis pipeline the commands adding a message to the list with the most recent messages
+    of a study session
+    """
+    study_session_messages_key = get_study_session_messages_key(session_code)
+
+    pipeline.lpush(study_session_messages_key, json.dumps(
+        {**message, 'create': message['create'].isoformat()}))
+    pipeline.ltrim(study_session_messages_key, 0,
+                   STUDY_SESSION_RECENT_MESSAGES_NUMBER - 1)
+    pipeline.expire(study_session_messages_key,
+                    settings.STUDY_SESSION_IDLE_TIMEOUT)
+
+
+def get_recent_study_session_messages(session_code: string, messages_number: int) -> list:
+    """
+    helper function that returns the most recent messages of a study session kept in redis, from the newest to the oldest
+    the messages have the same values as the ones from the database, except pk, which is 0 (they may not be saved yet)
+    """
+    redis_client = get_redis_client()
+
+    recent_messages = []
+    for encoded_message in redis_client.lrange(get_study_session_messages_key(session_code), 0, messages_number - 1):
+        message = json.loads(encoded_message)
+        message['create'] = datetime.datetime.fromisoformat(message['create'])
+        message['pk'] = 0
+        recent_messages.append(message)
+
+    return recent_messages
+
+
+async def aget_recent_study_session_messages(session_code: string, messages_number: int) -> list:
     """
-    study_session_group_key = f"asgi:group:study_session_{session_code}"
+    async version of get_recent_study_session_messages
+    """
+    redis_client = get_async_redis_client()
+
+    recent_messages = []
+    for encoded_message in await redis_client.lrange(get_study_session_messages_key(session_code), 0, messages_number - 1):
+        message = json.loads(encoded_message)
+        message['create'] = datetime.datetime.fromisoformat(message['create'])
+        message['pk'] = 0
+        recent_messages.append(message)
+
+    return recent_messages
+
+
+def get_study_session_messages_page(session_code: string, messages_cursor: string, page_size: int) -> tuple:
+    """
+    helper function that returns a page of a study session chat history, from the newest to the oldest message,
+    and the cursor of the next page (None if there is no next page)
+    the messages are dictionaries with the values: pk, create, message_content, user_id, user__username
+
+    messages_cursor: the cursor of the page (None for the first page)
+
+    the first page is served from the most recent messages kept in redis, which include the messages not saved yet
+    by the write-behind buffer of the chat consumers
+    the other pages (and the rest of a first page with too few messages in redis) are fetched with a single query
+    on the (group_name, create, id) index, so every page costs the same
+    raises ValueError if the cursor is not valid
+    """
+    recent_messages = []
+    if not messages_cursor:
+        recent_messages = get_recent_study_session_messages(
+            session_code, page_size + 1)
+
+        if len(recent_messages) > page_size:
+            return split_study_session_messages_page(recent_messages, page_size)
+
+        # with at most a page of messages, the list can't tell if there are older messages in the database
+        # (e.g. the list was lost on a redis restart), so the page is completed with the messages older than the list
+        if recent_messages:
+            messages_cursor = encode_messages_cursor(recent_messages[-1])
+
+    loaded_messages = recent_messages + list(get_study_session_messages_query(
+        session_code, messages_cursor, page_size - len(recent_messages)))
 
-    cache.delete(session_code)
-    cache.delete(study_session_group_key)
-    delete_study_session_chat_history(session_code)
+    return split_study_session_messages_page(loaded_messages, page_size)
+
+
+async def aget_study_session_messages_page(session_code: string, messages_cursor: string, page_size: int) -> tuple:
+    """
+    async version of get_study_session_messages_page
+    """
+    recent_messages = []
+    if not messages_cursor:
+        recent_messages = await aget_recent_study_session_messages(
+            session_code, page_size + 1)
+
+        if len(recent_messages) > page_size:
+            return split_study_session_messages_page(recent_messages, page_size)
+
+        if recent_messages:
+            messages_cursor = encode_messages_cursor(recent_messages[-1])
+
+    loaded_messages = recent_messages + [message async for message in get_study_session_messages_query(
+        session_code, messages_cursor, page_size - len(recent_messages))]
+
+    return split_study_session_messages_page(loaded_messages, page_size)
+
+
+def get_study_session_messages_query(session_code: string, messages_cursor: string, page_size: int) -> QuerySet:
+    """
+    helper function that returns the query fetching a page of a study session chat history from the database
+    one message more than the page size is fetched to find out if there is a next page
+    raises ValueError if the cursor is not valid
+    """
+    study_session_messages = StudySessionMessage.objects.filter(
+        group_name=f"study_session_{session_code}").order_by("-create", "-pk").values(
+            'pk', 'create', 'message_content', 'user_id', 'user__username')
+
+    if messages_cursor:
+        cursor_create, cursor_pk = decode_messages_cursor(messages_cursor)
+        # the redundant create <= cursor condition lets the database do a range scan on the index
+        study_session_messages = study_session_messages.filter(
+            Q(create__lte=cursor_create),
+            Q(create__lt=cursor_create) | Q(pk__lt=cursor_pk))
+
+    return study_session_messages[:page_size + 1]
+
+
+def split_study_session_messages_page(loaded_messages: list, page_size: int) -> tuple:
+    """
+    helper function that returns the messages of a page and the cursor of the next page (None if there is no next page)
+
+    loaded_messages: the messages of the page and, if there is a next page, the first message of the next page
+    """
+    if len(loaded_messages) > page_size:
+        loaded_messages = loaded_messages[:page_size]
+        # the cursor of a message with pk 0 (not saved yet) points to all messages created before it
+        return loaded_messages, encode_messages_cursor(loaded_messages[-1])
+
+    return loaded_messages, None
+
+
+def add_remove_study_session_commands(pipeline, session_code: string):
+    """
+    helper function that adds to a redis pipeline the commands removing a study session
+    (the participants, the code reservation, the recent messages and the group of the channel layer)
+    """
+    pipeline.delete(get_study_session_key(session_code),
+                    get_study_session_code_key(session_code),
+                    get_study_session_messages_key(session_code),
+                    get_study_session_group_key(session_code))
+    pipeline.zrem(STUDY_SESSIONS_ACTIVITY_KEY, session_code)
 
 
 def get_friend_request(user_1: User, user_2: User):
@@ -162,19 +806,32 @@ def get_friend_request(user_1: User, user_2: User):
     precondition: user_1 and user_2 are both valid users
     """
 
-    # first search: user_1 as sender, user_2 as receiver
-    try:
-        friend_request = FriendRequest.objects.get(
-            sender=user_1, receiver=user_2)
-    except:
-        # second search: user_2 as sender, user_1 as receiver
-        try:
-            friend_request = FriendRequest.objects.get(
-                sender=user_2, receiver=user_1)
-        except:
-            return None
+    # both directions (user_1 as sender or as receiver) are searched with a single query
+    return FriendRequest.objects.filter(
+        Q(sender=user_1, receiver=user_2) | Q(sender=user_2, receiver=user_1)
+    ).select_related('sender').first()
+
+
+def get_friendship_pair(user_1_id: int, user_2_id: int) -> tuple:
+    """
+    helper function that returns the ids of two users in the canonical order in which a friendship between them is stored
+    """
+    return (user_1_id, user_2_id) if user_1_id < user_2_id else (user_2_id, user_1_id)
+
+
+def create_friendship(user_1: User, user_2: User) -> Friendship:
+    """
+    helper function that creates a friendship between two users
+    if the users are already friends (e.g. the friend request was accepted concurrently), the existing friendship is returned
+
+    precondition: user_1 and user_2 are both valid users
+    """
+    user_1_id, user_2_id = get_friendship_pair(user_1.id, user_2.id)
+
+    friendship, _ = Friendship.objects.get_or_create(
+        user_1_id=user_1_id, user_2_id=user_2_id)
 
-    return friend_request
+    return friendship
 
 
 def check_friendship(user_1: User, user_2: User):
@@ -183,19 +840,9 @@ def check_friendship(user_1: User, user_2: User):
 
     precondition: user_1 and user_2 are both valid users
     """
-    friends = False
-
-    try:
-        friendship = Friendship.objects.get(user_1=user_1, user_2=user_2)
-        friends = True
-    except:
-        try:
-            friendship = Friendship.objects.get(user_1=user_2, user_2=user_1)
-            friends = True
-        except:
-            friends = False
+    user_1_id, user_2_id = get_friendship_pair(user_1.id, user_2.id)
 
-    return friends
+    return Friendship.objects.filter(user_1_id=user_1_id, user_2_id=user_2_id).exists()
 
 
 def check_pending_friend_request(sender_user: User, receiver_user: User):
@@ -218,55 +865,599 @@ def check_pending_friend_request(sender_user: User, receiver_user: User):
     return found
 
 
-def increment_folder_flashcards_number(folder: FlashcardsFolder):
+def get_friends_key(user_id: int) -> string:
+    """
+    helper function that returns the cache key under which the friends of a user are stored
+    """
+    return f"friends:{user_id}"
+
+
+async def aget_friends_usernames(user_id: int) -> set:
+    """
+    helper function that returns the set with the usernames of all friends of a user
+    the set is stored in cache memory until a friendship of the user is created or deleted
+    """
+    record_key = get_friends_key(user_id)
+
+    friends_usernames = await cache.aget(record_key)
+    if friends_usernames is not None:
+        return friends_usernames
+
+    friends_usernames = get_friends_usernames_from_friendships(
+        user_id, [friendship async for friendship in get_friendships_usernames_query(user_id)])
+
+    await cache.aset(record_key, friends_usernames, timeout=None)
+
+    return friends_usernames
+
+
+def get_friendships_usernames_query(user_id: int) -> QuerySet:
+    """
+    helper function that returns the query fetching the usernames of both users of every friendship of a user
+    """
+    return Friendship.objects.filter(
+        Q(user_1_id=user_id) | Q(user_2_id=user_id)
+    ).values_list('user_1_id', 'user_1__username', 'user_2__username')
+
+
+def get_friends_usernames_from_friendships(user_id: int, friendships) -> set:
+    """
+    helper function that returns the set with the usernames of the friends of a user from the values of his friendships
+    """
+    friends_usernames = set()
+    for user_1_id, user_1_username, user_2_username in friendships:
+        friends_usernames.add(
+            user_2_username if user_1_id == user_id else user_1_username)
+
+    return friends_usernames
+
+
+def delete_friends_usernames(*users_ids: int):
+    """
+    helper function that deletes from cache memory the friends of the given users
+    this function is intended to be called every time a friendship between the users is created or deleted
+    """
+    cache.delete_many([get_friends_key(user_id) for user_id in users_ids])
+
+
+def get_profile_picture_url_key(user_id: int) -> string:
+    """
+    helper function that returns the cache key under which the profile picture url of a user is stored
+    """
+    return f"profile_picture_url:{user_id}"
+
+
+def get_profile_pictures_urls(users_ids) -> dict:
+    """
+    helper function that returns a dictionary with the profile picture url of every given user (by user id)
+    the users without a profile picture have the default profile picture url
+
+    the urls are stored in cache memory until the user profile is updated, so the urls of all users are fetched
+    with a single cache request and just the missing ones are fetched from the database (with a single query)
+    """
+    records_keys = {get_profile_picture_url_key(
+        user_id): user_id for user_id in set(users_ids)}
+
+    profile_pictures_urls = {records_keys[record_key]: profile_picture_url for record_key,
+                             profile_picture_url in cache.get_many(records_keys.keys()).items()}
+
+    missing_users_ids = set(records_keys.values()) - \
+        profile_pictures_urls.keys()
+    if missing_users_ids:
+        missing_profile_pictures_urls = get_profile_pictures_urls_from_profiles(
+            missing_users_ids, get_profile_pictures_query(missing_users_ids))
+
+        cache.set_many({get_profile_picture_url_key(user_id): profile_picture_url for user_id,
+                       profile_picture_url in missing_profile_pictures_urls.items()}, timeout=None)
+
+        profile_pictures_urls.update(missing_profile_pictures_urls)
+
+    return profile_pictures_urls
+
+
+async def aget_profile_pictures_urls(users_ids) -> dict:
+    """
+    async version of get_profile_pictures_urls
+    """
+    records_keys = {get_profile_picture_url_key(
+        user_id): user_id for user_id in set(users_ids)}
+
+    profile_pictures_urls = {records_keys[record_key]: profile_picture_url for record_key,
+                             profile_picture_url in (await cache.aget_many(records_keys.keys())).items()}
+
+    missing_users_ids = set(records_keys.values()) - \
+        profile_pictures_urls.keys()
+    if missing_users_ids:
+        missing_profile_pictures_urls = get_profile_pictures_urls_from_profiles(
+            missing_users_ids, [user_profile async for user_profile in get_profile_pictures_query(missing_users_ids)])
+
+        await cache.aset_many({get_profile_picture_url_key(user_id): profile_picture_url for user_id,
+                               profile_picture_url in missing_profile_pictures_urls.items()}, timeout=None)
+
+        profile_pictures_urls.update(missing_profile_pictures_urls)
+
+    return profile_pictures_urls
+
+
+def get_profile_pictures_query(users_ids) -> QuerySet:
+    """
+    helper function that returns the query fetching the profile pictures of the given users
+    """
+    return UserProfile.objects.filter(user_id__in=users_ids).only('user_id', 'profile_picture')
+
+
+def get_profile_pictures_urls_from_profiles(users_ids, user_profiles) -> dict:
+    """
+    helper function that returns a dictionary with the profile picture url of every given user (by user id),
+    built from their user profiles (the users without a profile picture have the default profile picture url)
+    """
+    profile_pictures_urls = {user_id: DEFAULT_PROFILE_PICTURE_URL
+                             for user_id in users_ids}
+
+    for user_profile in user_profiles:
+        if user_profile.profile_picture:
+            profile_pictures_urls[user_profile.user_id] = user_profile.profile_picture.url
+
+    return profile_pictures_urls
+
+
+def delete_profile_picture_url(user_id: int):
+    """
+    helper function that deletes from cache memory the profile picture url of a user
+    this function is intended to be called every time the user profile is updated
+    """
+    cache.delete(get_profile_picture_url_key(user_id))
+
+
+def annotate_friendship_status(users: QuerySet, session_user: User) -> QuerySet:
+    """
+    helper function that annotates every user from the given queryset with his relation to the session user:
+        is_friend: the user is friend with the session user
+        pending_request_received: there is a friend request in pending sent by the session user to the user
+        pending_request_sent: there is a friend request in pending sent by the user to the session user
+
+    the annotations are computed with subqueries, so the relations of all users are fetched in the same query
+    """
+    return users.annotate(
+        is_friend=Exists(Friendship.objects.filter(
+            Q(user_1=session_user, user_2=OuterRef('pk')) |
+            Q(user_1=OuterRef('pk'), user_2=session_user))),
+        pending_request_received=Exists(FriendRequest.objects.filter(
+            sender=session_user, receiver=OuterRef('pk'), status='pending')),
+        pending_request_sent=Exists(FriendRequest.objects.filter(
+            sender=OuterRef('pk'), receiver=session_user, status='pending'))
+    )
+
+
+def increment_folder_flashcards_number(folder_id: int, flashcards_number: int = 1):
+    """
+    helper function that increments the flashcards number of a folder (by 1 by default)
+    the counter is incremented by the database (UPDATE ... SET flashcards_number = flashcards_number + n),
+    so concurrent updates are not lost; it is intended to be called in the transaction that creates the flashcards
+
+    precondition: folder_id is the id of a valid FlashcardsFolder
+    """
+    FlashcardsFolder.objects.filter(pk=folder_id).update(
+        flashcards_number=F('flashcards_number') + flashcards_number)
+
+
+def decrement_folder_flashcards_number(folder_id: int, flashcards_number: int = 1):
+    """
+    helper function that decrements the flashcards number of a folder (by 1 by default)
+    the counter is decremented by the database, in the same way as in increment_folder_flashcards_number
+
+    precondition: folder_id is the id of a valid FlashcardsFolder
+    """
+    # a counter that drifted below the real number is left unchanged (the counter can't be negative),
+    # it is repaired by the recount_flashcards management command
+    FlashcardsFolder.objects.filter(pk=folder_id, flashcards_number__gte=flashcards_number).update(
+        flashcards_number=F('flashcards_number') - flashcards_number)
+
+
+def recount_folders_flashcards_number() -> int:
+    """
+    helper function that sets the flashcards number of every folder to the real number of flashcards in the folder
+    the flashcards of all folders are counted with a single grouped query and just the wrong counters are updated
+    returns the number of folders updated
+    """
+    flashcards_numbers = dict(Flashcard.objects.order_by().values_list(
+        'folder_id').annotate(flashcards_number=Count('pk')))
+
+    folders = []
+    for folder in FlashcardsFolder.objects.only('pk', 'flashcards_number').iterator():
+        flashcards_number = flashcards_numbers.get(folder.pk, 0)
+        if folder.flashcards_number != flashcards_number:
+            folder.flashcards_number = flashcards_number
+            folders.append(folder)
+
+    FlashcardsFolder.objects.bulk_update(
+        folders, ['flashcards_number'], batch_size=1000)
+
+    return len(folders)
+
+
+def get_folder_flashcards_page(folder_id: int, flashcards_cursor: string, page_size: int) -> tuple:
+    """
+    helper function that returns a page of the flashcards of a folder, in the order of their creation,
+    and the cursor of the next page (None if there is no next page)
+    the flashcards are dictionaries with the values: id, front_side_text, back_side_text
+
+    flashcards_cursor: the id of the last flashcard of the previous page (None for the first page)
+
+    the pages are fetched with a single query on the (folder_id, id) index, so every page costs the same
+    raises ValueError if the cursor is not valid
+    """
+    folder_flashcards = Flashcard.objects.filter(folder_id=folder_id).order_by('pk').values(
+        'id', 'front_side_text', 'back_side_text')
+
+    if flashcards_cursor:
+        folder_flashcards = folder_flashcards.filter(
+            pk__gt=int(flashcards_cursor))
+
+    # one flashcard more than the page size is fetched to find out if there is a next page
+    loaded_flashcards = list(folder_flashcards[:page_size + 1])
+
+    if len(loaded_flashcards) > page_size:
+        loaded_flashcards = loaded_flashcards[:page_size]
+        return loaded_flashcards, str(loaded_flashcards[-1]['id'])
+
+    return loaded_flashcards, None
+
+
+# grades of a flashcard review (SM-2): 0 - 2 the answer was forgotten, 3 - 5 the answer was remembered (from hard to easy)
+FLASHCARD_REVIEW_GRADES = range(0, 6)
+
+# the ease factor of a flashcard never drops below this value (SM-2), so the intervals still grow for the hardest flashcards
+MINIMUM_EASE_FACTOR = 1.3
+
+# the intervals stop growing at 100 years (the due dates of the easiest flashcards stay far from the datetime limits)
+MAXIMUM_REVIEW_INTERVAL = 36500
+
+
+def schedule_flashcard_review(flashcard: Flashcard, grade: int, reviewed_at: datetime.datetime):
+    """
+    helper function that updates the review state of a flashcard after a review, with the SM-2 algorithm,
+    and schedules its next review, at most MAXIMUM_REVIEW_INTERVAL days later (the flashcard is not saved)
+
+    grade: the grade of the review, one of FLASHCARD_REVIEW_GRADES
+    """
+    if grade >= 3:
+        if flashcard.repetitions == 0:
+            flashcard.interval = 1
+        elif flashcard.repetitions == 1:
+            flashcard.interval = 6
+        else:
+            flashcard.interval = min(MAXIMUM_REVIEW_INTERVAL, round(
+                flashcard.interval * flashcard.ease_factor))
+
+        flashcard.repetitions += 1
+    else:
+        # a forgotten flashcard is learned again from the beginning
+        flashcard.repetitions = 0
+        flashcard.interval = 1
+
+    flashcard.ease_factor = max(MINIMUM_EASE_FACTOR, flashcard.ease_factor +
+                                0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+
+    flashcard.last_reviewed_at = reviewed_at
+    flashcard.due_at = reviewed_at + \
+        datetime.timedelta(days=flashcard.interval)
+
+
+def get_due_flashcards(user_id: int, folder_id: int, flashcards_number: int) -> list:
+    """
+    helper function that returns the next flashcards due for review of a user (from a folder or from all his folders),
+    from the most overdue one
+    the flashcards are dictionaries with the values: id, front_side_text, back_side_text
+
+    folder_id: the id of the folder (None for all folders of the user)
+
+    the flashcards are fetched with a single range scan on the (folder, due_at) or (user, due_at) index,
+    so the cost doesn't depend on the number of flashcards in the folder
+    """
+    due_flashcards = Flashcard.objects.filter(due_at__lte=timezone.now())
+
+    if folder_id is None:
+        due_flashcards = due_flashcards.filter(user_id=user_id)
+    else:
+        due_flashcards = due_flashcards.filter(folder_id=folder_id)
+
+    return list(due_flashcards.order_by('due_at').values(
+        'id', 'front_side_text', 'back_side_text')[:flashcards_number])
+
+
+# number of flashcards written with a single INSERT (and a single counter update) by the import
+FLASHCARDS_IMPORT_BATCH_SIZE = 500
+
+# number of flashcards fetched with a single query by the export
+FLASHCARDS_EXPORT_BATCH_SIZE = 2000
+
+# content types of the file formats supported by the flashcards import and export
+FLASHCARDS_FILE_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'tsv': 'text/tab-separated-values',
+    'json': 'application/json',
+}
+
+# size of the text chunks read from the imported files
+FLASHCARDS_FILE_CHUNK_SIZE = 64 * 1024
+
+
+def get_flashcards_file_format(flashcards_file) -> string:
+    """
+    helper function that returns the format of an uploaded flashcards file (its lowercase extension)
+    """
+    return flashcards_file.name.rsplit('.', 1)[-1].lower()
+
+
+def read_flashcards_file(flashcards_file, file_format: string):
+    """
+    helper function that reads the rows of an uploaded flashcards file one by one, without loading the whole file
+    yields (row number, row) pairs, where row is a list (csv, tsv) or any json value (json)
+    the validation of the rows is done by get_flashcard_sides
+
+    flashcards_file: an uploaded file (utf-8 encoded)
+    file_format: 'csv', 'tsv' or 'json'
+    raises ValueError if the file can't be read
+    """
+    flashcards_file.seek(0)
+    text_stream = io.TextIOWrapper(
+        flashcards_file.file, encoding='utf-8-sig', newline='')
+
+    try:
+        if file_format == 'json':
+            yield from enumerate(read_json_array_items(text_stream), start=1)
+        else:
+            yield from read_delimited_flashcards_rows(text_stream, ',' if file_format == 'csv' else '\t')
+    except UnicodeDecodeError:
+        raise ValueError("The file has to be encoded in UTF-8!")
+    except csv.Error as error:
+        raise ValueError(f"Invalid {file_format.upper()} file: {error}")
+    finally:
+        # the uploaded file is closed by django, not by the text wrapper
+        text_stream.detach()
+
+
+def read_delimited_flashcards_rows(text_stream, delimiter: string):
+    """
+    helper function that reads the rows of a csv or tsv flashcards file (front side, back side, other columns ignored)
+    the header lines of the Anki exports (#separator:tab, #html:false etc.) and a front/back header row are skipped
+    """
+    rows = csv.reader(text_stream, delimiter=delimiter)
+
+    header = True
+    for row in rows:
+        if not row or not any(cell.strip() for cell in row):
+            continue
+
+        if header:
+            if row[0].startswith('#'):
+                continue
+
+            header = False
+            if [cell.strip().lower() for cell in row[:2]] in (['front', 'back'], ['front_side_text', 'back_side_text']):
+                continue
+
+        yield rows.line_num, row
+
+
+def read_json_array_items(text_stream, max_item_size: int = 1024 * 1024):
+    """
+    helper function that reads the items of a json array one by one, decoding the text in chunks
+    raises ValueError if the text is not a json array or an item is larger than max_item_size characters
+    """
+    decoder = json.JSONDecoder()
+
+    buffer = text_stream.read(FLASHCARDS_FILE_CHUNK_SIZE)
+    position = 0
+    eof = not buffer
+    expected = '['
+
+    while True:
+        # skipping the whitespaces between the tokens of the array
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+
+            if position < len(buffer) or eof:
+                break
+
+            buffer, position = text_stream.read(FLASHCARDS_FILE_CHUNK_SIZE), 0
+            eof = not buffer
+
+        if position == len(buffer):
+            raise ValueError("Invalid JSON file: unexpected end of file!")
+
+        character = buffer[position]
+        if expected == '[':
+            if character != '[':
+                raise ValueError(
+                    "Invalid JSON file: the file has to contain an array of flashcards!")
+
+            position += 1
+            expected = 'item or ]'
+            continue
+
+        if character == ']' and expected != 'item':
+            return
+
+        if expected == ', or ]':
+            if character != ',':
+                raise ValueError(
+                    "Invalid JSON file: the flashcards have to be separated by commas!")
+
+            position += 1
+            expected = 'item'
+            continue
+
+        # an item may continue in the next chunks of the file
+        while True:
+            try:
+                item, item_end = decoder.raw_decode(buffer, position)
+                # a number is complete only if it is followed by a separator (e.g. "12" may continue with "345" or ".5")
+                if isinstance(item, (dict, list)) or eof or \
+                        (item_end < len(buffer) and (buffer[item_end] in ',]' or buffer[item_end].isspace())):
+                    position = item_end
+                    break
+                if len(buffer) - position > max_item_size:
+                    raise ValueError(
+                        "Invalid JSON file: the flashcards have to be separated by commas!")
+            except json.JSONDecodeError as error:
+                if eof or len(buffer) - position > max_item_size:
+                    raise ValueError(f"Invalid JSON file: {error.msg}!")
+
+            chunk = text_stream.read(FLASHCARDS_FILE_CHUNK_SIZE)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+
+        yield item
+        expected = ', or ]'
+
+
+def get_flashcard_sides(row) -> tuple:
+    """
+    helper function that returns the front side text and the back side text of a flashcard from an imported row
+    returns None if the row is not a valid flashcard (both sides have to be non-empty texts)
+
+    row: a list ([front, back, ...]) or a dictionary ({"front": ..., "back": ...} or {"front_side_text": ..., "back_side_text": ...})
+    """
+    if isinstance(row, dict):
+        front_side_text = row.get('front', row.get('front_side_text'))
+        back_side_text = row.get('back', row.get('back_side_text'))
+    elif isinstance(row, list) and len(row) >= 2:
+        front_side_text, back_side_text = row[0], row[1]
+    else:
+        return None
+
+    if not isinstance(front_side_text, str) or not isinstance(back_side_text, str):
+        return None
+
+    front_side_text = front_side_text.strip()
+    back_side_text = back_side_text.strip()
+    if not front_side_text or not back_side_text:
+        return None
+
+    return front_side_text, back_side_text
+
+
+def save_flashcards_batch(folder: FlashcardsFolder, flashcards: list):
+    """
+    helper function that saves a batch of flashcards of a folder with a single INSERT
+    the flashcards and the folder counter are written in the same transaction
+    """
+    with transaction.atomic():
+        Flashcard.objects.bulk_create(flashcards)
+        increment_folder_flashcards_number(folder.pk, len(flashcards))
+
+        # bulk_create doesn't send the post_save signals which keep the search index up to date
+        if not fulltext_search_supported():
+            index_documents('flashcard', flashcards)
+
+
+def import_flashcards(user: User, folder: FlashcardsFolder, flashcards_rows) -> tuple:
+    """
+    helper function that adds to a folder the flashcards from the rows of an imported file
+    the rows are validated and saved in batches of FLASHCARDS_IMPORT_BATCH_SIZE flashcards, so the file is never fully in memory
+    returns the number of flashcards imported and the list with the numbers of the invalid rows (which are skipped)
+
+    flashcards_rows: (row number, row) pairs, as returned by read_flashcards_file
+    raises ValueError if the file can't be read (the batches saved before the error are kept)
     """
-    helper function that increments by 1 the flashcards number of a given folder
+    imported_flashcards_number = 0
+    invalid_rows_numbers = []
+    flashcards = []
+
+    try:
+        for row_number, row in flashcards_rows:
+            flashcard_sides = get_flashcard_sides(row)
+            if flashcard_sides is None:
+                invalid_rows_numbers.append(row_number)
+                continue
+
+            flashcards.append(Flashcard(user=user, folder=folder,
+                                        front_side_text=flashcard_sides[0], back_side_text=flashcard_sides[1]))
 
-    precondition: folder is a valid FlashcardsFolder
+            if len(flashcards) == FLASHCARDS_IMPORT_BATCH_SIZE:
+                save_flashcards_batch(folder, flashcards)
+                imported_flashcards_number += len(flashcards)
+                flashcards = []
+    except ValueError as error:
+        raise ValueError(
+            f"{error} {imported_flashcards_number} flashcards were imported before the error.")
+
+    if flashcards:
+        save_flashcards_batch(folder, flashcards)
+        imported_flashcards_number += len(flashcards)
+
+    return imported_flashcards_number, invalid_rows_numbers
+
+
+class EchoBuffer:
+    """
+    class responsible with returning the text written by a csv writer, instead of storing it
     """
 
-    new_folder_flashcards_number = folder.flashcards_number + 1
-    setattr(folder, "flashcards_number", new_folder_flashcards_number)
-    folder.save()
+    def write(self, value):
+        return value
 
 
-def decrement_folder_flashcards_number(folder: FlashcardsFolder):
+async def aexport_flashcards(folder: FlashcardsFolder, file_format: string):
     """
-    helper function that decrements by 1 the flashcards number of a given folder
+    helper function that yields the text of a file with the flashcards of a folder, in batches of FLASHCARDS_EXPORT_BATCH_SIZE flashcards
+    the batches are fetched with keyset pagination on the flashcard id, so the folder is never fully in memory
+    it is an async generator, so daphne can stream it (the sync iterators of a StreamingHttpResponse are fully consumed under ASGI)
 
-    precondition: folder is a valid FlashcardsFolder, folder.flashcards_number > 0
+    file_format: 'csv', 'tsv' or 'json'
     """
+    csv_writer = csv.writer(
+        EchoBuffer(), delimiter=',' if file_format == 'csv' else '\t')
+
+    if file_format == 'json':
+        yield '['
 
-    new_folder_flashcards_number = folder.flashcards_number - 1
-    setattr(folder, "flashcards_number", new_folder_flashcards_number)
-    folder.save()
+    last_flashcard_id = 0
+    first_batch = True
+    while True:
+        flashcards = [flashcard async for flashcard in Flashcard.objects.filter(
+            folder_id=folder.pk, pk__gt=last_flashcard_id).order_by('pk').values_list(
+                'pk', 'front_side_text', 'back_side_text')[:FLASHCARDS_EXPORT_BATCH_SIZE]]
+        if not flashcards:
+            break
 
+        last_flashcard_id = flashcards[-1][0]
 
-def joined_in_study_session(username: string, session_code: string) -> bool:
+        if file_format == 'json':
+            batch_text = ','.join(json.dumps({'front': front_side_text, 'back': back_side_text})
+                                  for _, front_side_text, back_side_text in flashcards)
+            yield batch_text if first_batch else ',' + batch_text
+        else:
+            yield ''.join(csv_writer.writerow([front_side_text, back_side_text])
+                          for _, front_side_text, back_side_text in flashcards)
+
+        first_batch = False
+
+    if file_format == 'json':
+        yield ']'
+
+
+async def ajoined_in_study_session(username: string, session_code: string) -> bool:
     """
     helper function that checks if a user is joined in a study session
 
     precondition: username corresponds to a valid user and session code corresponds to a valid study session
     """
-    users = cache.get(session_code, [])
+    redis_client = get_async_redis_client()
 
-    return username in users
+    return await redis_client.sismember(get_study_session_key(session_code), username) == 1
 
 
-def allowed_to_study_session(username: string, session_code: string) -> bool:
+async def aallowed_to_study_session(user: User, session_code: string) -> bool:
     """
     helper function that checks if a user is allowed to join a study session
     a user is allowed to join a study session only if he is friend with at least one of the study session participants
 
-    precondition: username corresponds to a valid user and session code corresponds to a valid study session
+    precondition: user is a valid user and session code corresponds to a valid study session
     """
-    allowed = False
-    users = cache.get(session_code, [])
-
-    for current_username in users:
-        user_to_check = User.objects.get(username=username)
-        current_user = User.objects.get(username=current_username)
-        if check_friendship(user_to_check, current_user):
-            allowed = True
+    users = await aget_study_session_users(session_code)
 
-    return allowed
+    return not (await aget_friends_usernames(user.id)).isdisjoint(users)
@@ -8,26 +8,29 @@ from django.utils.decorators import method_decorator
 from django.contrib import messages
 from .forms import SignUpForm, ResetPasswordForm, EditAccountForm, FlashcardsFolderForm, FlashcardForm
 from django.views.generic.list import ListView
-from .models import Task, UserProfile, FriendRequest, Friendship, FlashcardsFolder, Flashcard
+from .models import Task, UserProfile, FriendRequest, FlashcardsFolder, Flashcard
 from django.views.generic.detail import DetailView
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin, AccessMixin
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
 import json
 from .utils import *
-from django.core.mail import send_mail
 from .decorators import login_required_restrictive, country_required
-from .decorators import ajax_request_required
+from .decorators import ajax_request_required, rate_limit
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from .forms import CreateTaskForm, UpdateTaskForm, JoinStudySessionForm
+from .forms import CreateTaskForm, UpdateTaskForm, JoinStudySessionForm, ImportFlashcardsForm
 from django.core.cache import cache
-from .serializers import StudySessionMessageSerializer
+from .serializers import StudySessionMessageValuesSerializer
+from .search import search_documents
 import re
 from django.core.paginator import Paginator
+from django.db import transaction
 
 
 def home(request):
@@ -187,20 +190,7 @@ def main_page(request):
     """
     rendering the main page
     """
-    tasks = Task.objects.filter(user=request.user)
-    deadline_freq = {}
-
-    for task in tasks:
-        if task.deadline is not None and task.is_complete == False:
-            # adjusting the deadline month to 0-indexed version of Javascript
-            deadline = str(timezone.localtime(task.deadline).year) + "-" + \
-                str(timezone.localtime(task.deadline).month - 1) + \
-                "-" + str(timezone.localtime(task.deadline).day)
-
-            if deadline in deadline_freq:
-                deadline_freq[deadline] += 1
-            else:
-                deadline_freq[deadline] = 1
+    deadline_freq = get_deadlines_frequency(request.user)
 
     currentDatetime = timezone.localtime(timezone.now()).isoformat()
 
@@ -270,8 +260,11 @@ class TaskList(LoginRequiredMixin, ListView):
             # we have to show all uncompleted tasks that have the
             # deadline date equal to the filter deadline date
             # this filter allows only pagination (no other filters are allowed; if other filters are set, the deadline filter will be ignored)
+            # the range mode (day, week or month) defaults to the day of the deadline date
+            deadline_range = self.request.GET.get('range', 'day')
             queryset = queryset.filter(is_complete=False)
-            queryset = filter_tasks_by_deadline_date(queryset, deadline_date)
+            queryset = filter_tasks_by_deadline_date(
+                queryset, deadline_date, deadline_range)
 
             return queryset
 
@@ -396,6 +389,8 @@ class TaskDelete(DeleteView):
 @require_POST
 @csrf_protect
 @ajax_request_required
+@rate_limit('verification_code', settings.VERIFICATION_CODE_RATE_LIMIT_CAPACITY,
+            1 / settings.VERIFICATION_CODE_RATE_LIMIT_INTERVAL)
 def send_verification_code(request):
     """
     sending a random generated code via email to the user
@@ -410,15 +405,15 @@ def send_verification_code(request):
         elif request.headers.get('X-Requested-For') == 'Reset_Password' and not email:
             return JsonResponse({'message': 'Missing fields!'}, status=400)
 
-        verification_code = generate_verification_code()
-
         record_key = ""
         if request.headers.get('X-Requested-For') == 'Registration':
             record_key = "registration:" + email
+            # the outstanding verification code is sent again if it hasn't expired yet
+            verification_code = get_or_create_verification_code(record_key)
 
-            send_mail(
+            enqueue_email(
                 'Verification code - Registration',
-                f'The verification code for {username} is: {verification_code}\nThis code will expire in 3 minutes!',
+                f'The verification code for {username} is: {verification_code}\nThis code will expire 3 minutes after it was first requested!',
                 'contdetestlucru@gmail.com',
                 [f"{email}"],
             )
@@ -426,17 +421,15 @@ def send_verification_code(request):
         else:
             # requested for password resetting
             record_key = "reset_password:" + email
+            verification_code = get_or_create_verification_code(record_key)
 
-            send_mail(
+            enqueue_email(
                 'Verification code - Password Reset',
-                f'The verification code is: {verification_code}\nThis code will expire in 3 minutes!',
+                f'The verification code is: {verification_code}\nThis code will expire 3 minutes after it was first requested!',
                 'contdetestlucru@gmail.com',
                 [f"{email}"],
             )
 
-        record_value = verification_code
-        save_verification_code(record_key, record_value)
-
         return JsonResponse({'message': 'Success!'})
 
 
@@ -532,23 +525,29 @@ def edit_account(request):
 
 @login_required(login_url='login')
 @country_required
-def collaborative_study_session_menu(request):
+async def collaborative_study_session_menu(request):
     """
     rendering the template for collaborative study session menu page
+    the view runs on the event loop (the redis and database calls are awaited)
     """
+    user = await request.auser()
 
     if request.method == "POST":
         form = JoinStudySessionForm(request.POST)
         if form.is_valid():
             session_code = form.cleaned_data['session_code']
 
-            if valid_study_session(session_code) == True:
-                if joined_in_study_session(request.user.username, session_code):
-                    return redirect('study_session', session_code=session_code)
-                elif allowed_to_study_session(request.user.username, session_code):
-                    add_user_to_study_session(
-                        session_code, request.user.username)
+            if await avalid_study_session(session_code) == True:
+                if await ajoined_in_study_session(user.username, session_code):
                     return redirect('study_session', session_code=session_code)
+                elif await aallowed_to_study_session(user, session_code):
+                    # the study session may have been removed after it was validated
+                    if await aadd_user_to_study_session(session_code, user.username):
+                        return redirect('study_session', session_code=session_code)
+
+                    messages.error(
+                        request, f"There is no active study session with the following session code: {session_code}")
+                    return redirect('error_404')
                 else:
                     messages.error(
                         request, f"You are not allowed to join the study session with the following code: {session_code}. You have to be friend with at least one of the study session participants!")
@@ -565,59 +564,56 @@ def collaborative_study_session_menu(request):
 
 @login_required(login_url='login')
 @country_required
-def study_session(request, session_code):
+async def study_session(request, session_code):
     """
     rendering the template for study session page
+    the view runs on the event loop (the redis and database calls are awaited)
     """
+    user = await request.auser()
 
-    if valid_study_session(session_code) == False:
+    if await avalid_study_session(session_code) == False:
         messages.error(
             request, f"There is no active study session with the following session code: {session_code}")
         return render(request, '404.html')
-    elif not joined_in_study_session(request.user.username, session_code):
+    elif not await ajoined_in_study_session(user.username, session_code):
         # this is for the case in which the user enters the study session via link, and not by submitting
         # the join study session form with the session code
-        if allowed_to_study_session(request.user.username, session_code):
-            add_user_to_study_session(session_code, request.user.username)
+        if await aallowed_to_study_session(user, session_code):
+            # the study session may have been removed after it was validated
+            if not await aadd_user_to_study_session(session_code, user.username):
+                messages.error(
+                    request, f"There is no active study session with the following session code: {session_code}")
+                return render(request, '404.html')
         else:
             messages.error(
                 request, f"You are not allowed to join the study session with the following code: {session_code}. You have to be friend with at least one of the study session participants!")
             return redirect('error_404')
 
     if request.method == "POST":
-        remove_user_from_study_session(session_code, request.user.username)
-
-        is_study_session_empty = study_session_empty(session_code)
-        if is_study_session_empty == True:
-            remove_study_session(session_code)
+        await aleave_study_session(session_code, user.username)
 
         return redirect('collaborative_study_session_menu')
 
     # fetching messages paginated
+    # the pages are fetched with a cursor that points to the oldest message already loaded
     messages_page_size = 10
-    default_messages_page = 1
-    current_messages_page = int(request.GET.get(
-        'messages-page', default_messages_page))
-
-    messages_page_offset = (current_messages_page - 1) * messages_page_size
-
-    study_session_messages = StudySessionMessage.objects.filter(
-        group_name=f"study_session_{session_code}").order_by("-create")
-
-    loaded_messages = study_session_messages[messages_page_offset:
-                                             messages_page_offset + messages_page_size]
+    messages_cursor = request.GET.get('messages-cursor')
 
     try:
-        next_unloaded_message = study_session_messages[messages_page_offset +
-                                                       messages_page_size]
-        has_next_messages_page = True
-    except IndexError:
-        next_unloaded_message = None
-        has_next_messages_page = False
+        loaded_messages, next_messages_cursor = await aget_study_session_messages_page(
+            session_code, messages_cursor, messages_page_size)
+    except ValueError:
+        return JsonResponse({
+            'error': "Invalid messages cursor!"
+        }, status=400)
+
+    has_next_messages_page = next_messages_cursor is not None
 
     loaded_messages = loaded_messages[::-1]
-    serialized_messages = StudySessionMessageSerializer(
-        loaded_messages, many=True)
+    profile_pictures_urls = await aget_profile_pictures_urls(
+        message['user_id'] for message in loaded_messages)
+    serialized_messages = StudySessionMessageValuesSerializer(
+        loaded_messages, profile_pictures_urls)
 
     # check if there was made an Ajax request
     # all pages except the first one are sent via Json Response
@@ -626,7 +622,7 @@ def study_session(request, session_code):
         return JsonResponse({
             'messages': serialized_messages.data,
             'has_next_messages_page': has_next_messages_page,
-            'next_messages_page': current_messages_page + 1
+            'next_messages_cursor': next_messages_cursor
         })
 
     # first messages page is sent in context data
@@ -634,36 +630,21 @@ def study_session(request, session_code):
         'session_code': session_code,
         'messages': serialized_messages.data,
         'has_next_messages_page': has_next_messages_page,
-        'next_messages_page': current_messages_page + 1
+        'next_messages_cursor': next_messages_cursor
     })
 
 
 @require_POST
 @csrf_protect
 @ajax_request_required
-def generate_study_session_code(request):
+async def generate_study_session_code(request):
     """
     generate a random and unique code for a study session
     """
+    user = await request.auser()
 
     if request.method == "POST":
-        letters = string.ascii_lowercase + string.ascii_uppercase
-
-        available_characters = list(letters)
-        random.shuffle(available_characters)
-
-        code_uniqueness = False
-        session_code = None
-        while code_uniqueness == False:
-            code = ""
-            for _ in range(12):
-                random_index = random.randint(0, len(available_characters) - 1)
-                code += available_characters[random_index]
-
-            if valid_study_session(code) == False:
-                register_study_session(code, request.user.username)
-                session_code = code
-                code_uniqueness = True
+        session_code = await aregister_study_session(user.username)
 
         return JsonResponse({'study_session_code': session_code})
 
@@ -701,7 +682,9 @@ class UsersList(LoginRequiredMixin, ListView):
             username_regex = r"^[\w.@+-]{1,150}\Z"
             if re.match(username_regex, input_username):
                 queryset = User.objects.filter(
-                    username__startswith=input_username)
+                    username__startswith=input_username).order_by('username')
+                queryset = annotate_friendship_status(
+                    queryset, self.request.user).select_related('user_profile')
 
         return queryset
 
@@ -812,10 +795,7 @@ def manage_friend_request(request):
             setattr(friend_request, 'status', 'accepted')
             friend_request.save()
 
-            Friendship.objects.create(
-                user_1=sender_user,
-                user_2=receiver_user
-            )
+            create_friendship(sender_user, receiver_user)
         elif action == "reject":
             if friend_request.status == 'accepted':
                 return JsonResponse({
@@ -940,10 +920,12 @@ def flashcard_create(request):
             front_side_text = form.cleaned_data['front_side_text']
             back_side_text = form.cleaned_data['back_side_text']
 
-            Flashcard.objects.create(user=request.user, folder=folder,
-                                     front_side_text=front_side_text, back_side_text=back_side_text)
+            # the flashcard and the folder counter are written in the same transaction
+            with transaction.atomic():
+                Flashcard.objects.create(user=request.user, folder=folder,
+                                         front_side_text=front_side_text, back_side_text=back_side_text)
 
-            increment_folder_flashcards_number(folder)
+                increment_folder_flashcards_number(folder.pk)
 
             return redirect('flashcards')
     else:
@@ -976,31 +958,33 @@ def flashcard_update(request, pk):
             new_front_side_text = form.cleaned_data['front_side_text']
             new_back_side_text = form.cleaned_data['back_side_text']
 
-            folder_modified = False
-            if new_folder.name != flashcard.folder.name:
-                folder_modified = True
-                decrement_folder_flashcards_number(flashcard.folder)
-
-                new_folder = FlashcardsFolder.objects.get(
-                    user=request.user, name=new_folder.name)
-                increment_folder_flashcards_number(new_folder)
-
+            # the folder returned by the form belongs to the user
+            old_folder_id = flashcard.folder_id
+            # just the modified fields are saved, so a review saved in the meantime isn't overwritten
+            modified_fields = []
+            if new_folder.pk != flashcard.folder_id:
+                modified_fields.append("folder")
                 setattr(flashcard, "folder", new_folder)
 
-            front_side_text_modified = False
             if new_front_side_text != flashcard.front_side_text:
                 print(new_front_side_text, flashcard.front_side_text)
-                front_side_text_modified = True
+                modified_fields.append("front_side_text")
                 setattr(flashcard, "front_side_text", new_front_side_text)
 
-            back_side_text_modified = False
             if new_back_side_text != flashcard.back_side_text:
                 print(new_back_side_text, flashcard.back_side_text)
-                back_side_text_modified = True
+                modified_fields.append("back_side_text")
                 setattr(flashcard, "back_side_text", new_back_side_text)
 
-            if folder_modified or front_side_text_modified or back_side_text_modified:
-                flashcard.save()
+            if modified_fields:
+                # the flashcard and the counters of both folders are written in the same transaction
+                with transaction.atomic():
+                    flashcard.save(update_fields=modified_fields)
+
+                    if "folder" in modified_fields:
+                        decrement_folder_flashcards_number(old_folder_id)
+                        increment_folder_flashcards_number(new_folder.pk)
+
                 return redirect('flashcards')
 
             form.add_error(None, "No field has been modified")
@@ -1033,9 +1017,9 @@ def flashcard_delete(request, pk):
         }, status=400)
 
     if request.method == "POST":
-        flashcard_folder = flashcard.folder
-        flashcard.delete()
-        decrement_folder_flashcards_number(flashcard_folder)
+        with transaction.atomic():
+            flashcard.delete()
+            decrement_folder_flashcards_number(flashcard.folder_id)
 
         return JsonResponse({'message': 'Success!'})
 
@@ -1054,14 +1038,181 @@ def folder(request, folder_name):
             request, "The folder that you are trying to access either doesn't exists or belongs to another user!")
         return render(request, '404.html')
 
-    flashcards = Flashcard.objects.filter(user=request.user, folder=folder)
+    # fetching flashcards paginated
+    # the pages are fetched with a cursor that points to the last flashcard already loaded
+    flashcards_page_size = 40
+    flashcards_cursor = request.GET.get('flashcards-cursor')
+
+    try:
+        flashcards, next_flashcards_cursor = get_folder_flashcards_page(
+            folder.pk, flashcards_cursor, flashcards_page_size)
+    except ValueError:
+        return JsonResponse({
+            'error': "Invalid flashcards cursor!"
+        }, status=400)
+
+    has_next_flashcards_page = next_flashcards_cursor is not None
 
+    # check if there was made an Ajax request
+    # all pages except the first one are sent via Json Response
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+
+        return JsonResponse({
+            'flashcards': flashcards,
+            'has_next_flashcards_page': has_next_flashcards_page,
+            'next_flashcards_cursor': next_flashcards_cursor
+        })
+
+    # first flashcards page is sent in context data
     return render(request, 'folder.html', {
         'folder_name': folder_name,
-        'flashcards': flashcards
+        'flashcards': flashcards,
+        'has_next_flashcards_page': has_next_flashcards_page,
+        'next_flashcards_cursor': next_flashcards_cursor
+    })
+
+
+@login_required(login_url='login')
+def flashcards_review(request, folder_name=None):
+    """
+    renders the review page with the flashcards due for review (from a folder or, without a folder name, from all folders)
+    """
+    folder_id = None
+    if folder_name is not None:
+        try:
+            folder_id = FlashcardsFolder.objects.only('id').get(
+                user=request.user, name=folder_name).id
+        except:
+            messages.error(
+                request, "The folder that you are trying to access either doesn't exists or belongs to another user!")
+            return render(request, '404.html')
+
+    # the due flashcards are fetched in batches, the next batch is requested after the current one was reviewed
+    due_flashcards_batch_size = 20
+    due_flashcards = get_due_flashcards(
+        request.user.id, folder_id, due_flashcards_batch_size)
+
+    # check if there was made an Ajax request
+    # all batches except the first one are sent via Json Response
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+
+        return JsonResponse({'flashcards': due_flashcards})
+
+    # first batch is sent in context data
+    return render(request, 'review_flashcards.html', {
+        'folder_name': folder_name,
+        'flashcards': due_flashcards
+    })
+
+
+@require_POST
+@csrf_protect
+@ajax_request_required
+def flashcard_review(request, pk):
+    """
+    handles the review of a flashcard (records the grade and schedules the next review)
+    """
+    try:
+        grade = int(json.loads(request.body).get('grade'))
+    except:
+        grade = None
+
+    if grade not in FLASHCARD_REVIEW_GRADES:
+        return JsonResponse({
+            'error': "The grade of the review is invalid!"
+        }, status=400)
+
+    with transaction.atomic():
+        try:
+            # the flashcard is locked, so concurrent reviews of the same flashcard are applied one after another
+            flashcard = Flashcard.objects.select_for_update().only(
+                'ease_factor', 'interval', 'repetitions').get(pk=pk, user_id=request.user.id)
+        except:
+            return JsonResponse({
+                'error': "The flashcard that you are trying to review either doesn't exists or you have no access to it!"
+            }, status=400)
+
+        schedule_flashcard_review(flashcard, grade, timezone.now())
+        flashcard.save(update_fields=[
+                       'ease_factor', 'interval', 'repetitions', 'due_at', 'last_reviewed_at'])
+
+    return JsonResponse({
+        'message': 'Success!',
+        'interval': flashcard.interval,
+        'due_at': flashcard.due_at.isoformat()
     })
 
 
+@login_required(login_url='login')
+@require_POST
+def flashcards_import(request, folder_name):
+    """
+    handles the import of the flashcards from a csv, tsv or json file into a folder
+    """
+
+    try:
+        folder = FlashcardsFolder.objects.get(
+            user=request.user, name=folder_name)
+    except:
+        messages.error(
+            request, "The folder that you are trying to access either doesn't exists or belongs to another user!")
+        return render(request, '404.html')
+
+    form = ImportFlashcardsForm(request.POST, request.FILES)
+    if not form.is_valid():
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+
+        return redirect('folder', folder_name=folder_name)
+
+    try:
+        imported_flashcards_number, invalid_rows_numbers = import_flashcards(
+            request.user, folder, read_flashcards_file(form.cleaned_data['flashcards_file'], form.cleaned_data['file_format']))
+    except ValueError as error:
+        messages.error(request, str(error))
+        return redirect('folder', folder_name=folder_name)
+
+    message = f"{imported_flashcards_number} flashcards were imported!"
+    if invalid_rows_numbers:
+        # just the first invalid rows are listed
+        message += f"\n{len(invalid_rows_numbers)} invalid rows were skipped (rows: " + \
+            ", ".join(str(row_number) for row_number in invalid_rows_numbers[:10]) + \
+            (", ..." if len(invalid_rows_numbers) > 10 else "") + ")"
+
+    messages.success(request, message)
+
+    return redirect('folder', folder_name=folder_name)
+
+
+@login_required(login_url='login')
+def flashcards_export(request, folder_name):
+    """
+    handles the export of the flashcards of a folder into a csv, tsv or json file
+    the file is streamed, the flashcards are fetched in batches while the response is sent
+    """
+
+    try:
+        folder = FlashcardsFolder.objects.get(
+            user=request.user, name=folder_name)
+    except:
+        messages.error(
+            request, "The folder that you are trying to access either doesn't exists or belongs to another user!")
+        return render(request, '404.html')
+
+    file_format = request.GET.get('format', 'csv')
+    if file_format not in FLASHCARDS_FILE_CONTENT_TYPES:
+        messages.error(request, "The flashcards can be exported just as CSV, TSV or JSON files!")
+        return redirect('folder', folder_name=folder_name)
+
+    response = StreamingHttpResponse(aexport_flashcards(folder, file_format),
+                                     content_type=FLASHCARDS_FILE_CONTENT_TYPES[file_format])
+    response['Content-Disposition'] = content_disposition_header(
+        True, f"{folder_name}.{file_format}")
+
+    return response
+
+
 @require_POST
 @csrf_protect
 @ajax_request_required
@@ -1081,3 +1232,35 @@ def folder_delete(request, pk):
         folder.delete()
 
         return JsonResponse({'message': 'Success!'})
+
+
+@login_required(login_url='login')
+@ajax_request_required
+def search(request):
+    """
+    handles the search request, returns (via Json Response) a page of the user's flashcards and tasks matching the query,
+    ranked by relevance
+    """
+
+    search_page_size = 20
+    query = request.GET.get('q', '').strip()
+
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 0
+
+    # the pages deeper than the maximum page are not served (the ranking cost grows with the page number)
+    if page < 1 or page > settings.SEARCH_MAX_PAGE:
+        return JsonResponse({
+            'error': "Invalid page number!"
+        }, status=400)
+
+    hits, has_next_page = search_documents(
+        request.user.pk, query, page, search_page_size)
+
+    return JsonResponse({
+        'hits': hits,
+        'page': page,
+        'has_next_page': has_next_page and page < settings.SEARCH_MAX_PAGE
+    })